@@ -1,18 +1,60 @@
 import subprocess
 import os
 import sys
+import json
 import time
-import win32gui
-import win32con
+
+from timing_profile import get_timing_profile
+
+try:
+    import win32gui
+    import win32con
+    import win32process
+except ImportError:  # Fuera de Windows (p.ej. replay/benchmarks en Linux) no hay manejo de ventanas
+    win32gui = None
+    win32con = None
+    win32process = None
 
 # Configuración
 NUM_EMULATORS = 4
-DELAY_BETWEEN_EMULATORS = 3  # segundos entre cada emulador
+DELAY_BETWEEN_EMULATORS = 3  # segundos de arranque de un emulador hasta tener tiempos medidos (ver timing_profile.py)
+READY_POLL_INTERVAL = 0.05   # segundos entre comprobaciones de los emuladores que arrancan
+READY_MIN_BRIGHTNESS = 5     # brillo medio mínimo del primer frame para dar un emulador por listo
+
+# Ventana de cada emulador por posición en la cuadrícula (se rellena al arrancar)
+EMULATOR_HWNDS = {}
 
 # Configuración de ventanas (más pequeñas)
 WINDOW_WIDTH = 400  # Reducido de 800 a 600
 WINDOW_HEIGHT = 400  # Reducido de 600 a 450
 WINDOW_SPACING = 0 # Reducido de 60 a 40
+GRID_COLS = 2
+GRID_LEFT = 0
+GRID_TOP = 0
+
+# Cuadrícula generada por grid_layout.py (reemplaza los valores de arriba si existe)
+LAYOUT_CONFIG_PATH = "coordinates/emulator_coordinates.json"
+
+def load_layout(config_path=LAYOUT_CONFIG_PATH):
+    """Aplica la sección "layout" de la configuración (número de emuladores y cuadrícula)"""
+    global NUM_EMULATORS, WINDOW_WIDTH, WINDOW_HEIGHT, WINDOW_SPACING, GRID_COLS, GRID_LEFT, GRID_TOP
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            layout = json.load(f).get('layout')
+    except (OSError, ValueError):
+        return False
+    if not layout:
+        return False
+    NUM_EMULATORS = layout['count']
+    WINDOW_WIDTH = layout['window_width']
+    WINDOW_HEIGHT = layout['window_height']
+    WINDOW_SPACING = layout.get('spacing', 0)
+    GRID_COLS = layout['cols']
+    GRID_LEFT = layout.get('left', 0)
+    GRID_TOP = layout.get('top', 0)
+    return True
+
+load_layout()
 
 # Rutas del emulador y ROM
 EMULATOR_PATH = r'E:\Emulador-GBA\visualboyadvance-m'
@@ -34,12 +76,13 @@ def verificar_archivos():
     print(f"✓ ROM encontrada: {ROM_PATH}")
     return True
 
-def calculate_position(index, cols=2):
+def calculate_position(index, cols=None):
     """Calcula la posición x,y para una ventana según su índice"""
+    cols = cols or GRID_COLS
     row = index // cols
     col = index % cols
-    x = col * (WINDOW_WIDTH + WINDOW_SPACING)
-    y = row * (WINDOW_HEIGHT + WINDOW_SPACING)
+    x = GRID_LEFT + col * (WINDOW_WIDTH + WINDOW_SPACING)
+    y = GRID_TOP + row * (WINDOW_HEIGHT + WINDOW_SPACING)
     return x, y
 
 def find_windows_by_process_name(process_name):
@@ -56,14 +99,57 @@ def find_windows_by_process_name(process_name):
     win32gui.EnumWindows(enum_windows_callback, None)
     return windows
 
+def emulator_region(index):
+    """Región de pantalla {"top", "left", "width", "height"} de la ventana del emulador index"""
+    x, y = calculate_position(index)
+    return {"top": y, "left": x, "width": WINDOW_WIDTH, "height": WINDOW_HEIGHT}
+
+def emulator_windows():
+    """Handles de las ventanas del emulador en el mismo orden en que se posicionan"""
+    if win32gui is None:
+        return []
+    if EMULATOR_HWNDS:
+        return [EMULATOR_HWNDS[i] for i in sorted(EMULATOR_HWNDS)]
+    return find_windows_by_process_name("visual")[:NUM_EMULATORS]
+
+def find_windows_by_pid(pids):
+    """{pid: hwnd} de la ventana principal visible de cada proceso de pids"""
+    found = {}
+    
+    def enum_windows_callback(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
+            _, pid = win32process.GetWindowThreadProcessId(hwnd)
+            if pid in pids and pid not in found:
+                found[pid] = hwnd
+        return True
+    
+    win32gui.EnumWindows(enum_windows_callback, None)
+    return found
+
+def position_window(index, hwnd):
+    """Coloca la ventana hwnd en la posición index de la cuadrícula"""
+    x, y = calculate_position(index)
+    try:
+        win32gui.SetWindowPos(hwnd, win32con.HWND_TOP, x, y, WINDOW_WIDTH, WINDOW_HEIGHT, 0)
+        window_text = win32gui.GetWindowText(hwnd)
+        print(f"✓ Ventana {index+1} '{window_text}' posicionada en ({x},{y}) - {WINDOW_WIDTH}x{WINDOW_HEIGHT}")
+        return True
+    except Exception as e:
+        print(f"Error posicionando ventana {index+1}: {e}")
+        return False
+
+def first_frame_ready(frame_source, index):
+    """True si la región del emulador index ya muestra algo (no está en negro)"""
+    try:
+        return frame_source.grab(emulator_region(index))[:, :, :3].mean() >= READY_MIN_BRIGHTNESS
+    except Exception:
+        return False
+
 def position_emulator_windows():
     """Posiciona todas las ventanas del emulador encontradas"""
     print("Buscando y posicionando ventanas del emulador...")
     
-    # Esperar un poco para que las ventanas aparezcan
-    time.sleep(3)
-    
-    windows = find_windows_by_process_name("visual")
+    windows = emulator_windows()
     
     if not windows:
         print("No se encontraron ventanas del emulador")
@@ -72,66 +158,170 @@ def position_emulator_windows():
     print(f"Encontradas {len(windows)} ventanas del emulador")
     
     for i, hwnd in enumerate(windows):
-        if i >= NUM_EMULATORS:
-            break
-            
-        x, y = calculate_position(i)
-        try:
-            win32gui.SetWindowPos(hwnd, win32con.HWND_TOP, x, y, WINDOW_WIDTH, WINDOW_HEIGHT, 0)
-            window_text = win32gui.GetWindowText(hwnd)
-            print(f"✓ Ventana {i+1} '{window_text}' posicionada en ({x},{y}) - {WINDOW_WIDTH}x{WINDOW_HEIGHT}")
-        except Exception as e:
-            print(f"Error posicionando ventana {i+1}: {e}")
+        position_window(i, hwnd)
 
-def abrir_emuladores():
-    """Abre múltiples instancias del emulador"""
+def wait_for_emulators(processes, timeout, timing=None, on_ready=None):
+    """
+    Sondea todos los emuladores a la vez hasta que cada uno esté listo:
+    proceso vivo -> ventana del PID (se coloca en su sitio en cuanto aparece) -> primer frame
+    processes: lista (índice = posición en la cuadrícula, None si no arrancó) o {índice: proceso}
+    on_ready(index, process, hwnd) se llama para cada emulador en cuanto está listo
+    Retorna {index: hwnd} de los emuladores listos
+    """
+    processes = dict(processes) if isinstance(processes, dict) else dict(enumerate(processes))
+    processes = {index: process for index, process in processes.items() if process is not None}
+    try:
+        from frame_source import MSSFrameSource
+        frame_source = MSSFrameSource()
+    except Exception:
+        frame_source = None  # sin captura basta con la ventana
+    
+    start = time.time()
+    pending = dict(processes)             # índice -> proceso aún no listo
+    windows = {}                          # índice -> hwnd ya colocado
+    ready = {}
+    
+    def mark_ready(index):
+        elapsed = time.time() - start
+        ready[index] = windows[index]
+        EMULATOR_HWNDS[index] = windows[index]
+        del pending[index]
+        print(f"✓ Emulador {index+1} listo en {elapsed:.1f} segundos")
+        if timing is not None:
+            timing.record("emulator_ready", elapsed)
+        if on_ready is not None:
+            on_ready(index, processes[index], windows[index])
+    
+    while pending and time.time() - start < timeout:
+        for index, process in list(pending.items()):
+            if process.poll() is not None:
+                print(f"✗ Emulador {index+1} terminó al arrancar (código {process.returncode})")
+                del pending[index]
+        
+        waiting = {process.pid: index for index, process in pending.items() if index not in windows}
+        if waiting:
+            for pid, hwnd in find_windows_by_pid(set(waiting)).items():
+                index = waiting[pid]
+                windows[index] = hwnd
+                position_window(index, hwnd)
+        
+        for index in [i for i in pending if i in windows]:
+            if frame_source is None or first_frame_ready(frame_source, index):
+                mark_ready(index)
+        
+        if pending:
+            time.sleep(READY_POLL_INTERVAL)
+    
+    for index in list(pending):
+        if index in windows:
+            # Ventana colocada pero sin imagen todavía: se usa igualmente
+            print(f"⚠️  Emulador {index+1} sin primer frame tras {timeout:.1f} segundos")
+            mark_ready(index)
+        else:
+            print(f"✗ No apareció la ventana del emulador {index+1} en {timeout:.1f} segundos")
+            if timing is not None:
+                timing.record("emulator_ready", timeout)
+    
+    if frame_source is not None:
+        frame_source.close()
+    return ready
+
+def abrir_emuladores(on_ready=None):
+    """
+    Abre todas las instancias del emulador a la vez y espera a que cada una esté lista
+    on_ready(index, process, hwnd): se llama para cada emulador en cuanto está listo
+    Retorna la lista de procesos por posición de la cuadrícula (None en las que no arrancaron)
+    """
     
     # Verificar archivos antes de comenzar
     if not verificar_archivos():
         sys.exit(1)
     
-    print(f"Iniciando {NUM_EMULATORS} emuladores con {DELAY_BETWEEN_EMULATORS}s de espera...")
+    # Con manejo de ventanas se espera a que cada emulador esté listo (y se mide);
+    # sin él, la espera fija sale de los arranques medidos antes
+    timing = get_timing_profile()
+    # (el límite por defecto es lo que antes se tardaba en abrirlos uno a uno)
+    launch_timeout = timing.timeout("emulator_ready", max(3, NUM_EMULATORS) * DELAY_BETWEEN_EMULATORS)
+    launch_delay = timing.delay("emulator_ready", DELAY_BETWEEN_EMULATORS)
+    
+    print(f"Iniciando {NUM_EMULATORS} emuladores a la vez...")
     print(f"✓ Configuración: {WINDOW_WIDTH}x{WINDOW_HEIGHT} pixels por ventana")
     
-    # Lista para guardar los procesos
-    processes = []
+    # Un proceso por posición de la cuadrícula: None si no se pudo abrir, para no desplazar a los demás
+    processes = [None] * NUM_EMULATORS
     
-    # Abrir múltiples emuladores
+    # Abrir todos los emuladores sin esperar entre uno y otro
     for i in range(NUM_EMULATORS):
         try:
-            print(f"Abriendo emulador {i+1}/{NUM_EMULATORS}...")
-            
-            # Calcular posición planeada
-            x, y = calculate_position(i)
-            print(f"  Posición planeada: ({x}, {y})")
-            
             # Comando para abrir emulador con ROM
             cmd = [EMULATOR_PATH + '.exe', ROM_PATH]
             process = subprocess.Popen(cmd, shell=False)
-            processes.append(process)
-            
-            print(f"✓ Emulador {i+1} iniciado (PID: {process.pid})")
+            processes[i] = process
             
-            # Esperar antes del siguiente (excepto en el último)
-            if i < NUM_EMULATORS - 1:
-                print(f"Esperando {DELAY_BETWEEN_EMULATORS} segundos...")
-                time.sleep(DELAY_BETWEEN_EMULATORS)
+            x, y = calculate_position(i)
+            print(f"✓ Emulador {i+1} iniciado (PID: {process.pid}) - posición planeada: ({x}, {y})")
                 
         except Exception as e:
             print(f"✗ Error al abrir emulador {i+1}: {e}")
     
-    print(f"\n¡{len(processes)} emuladores iniciados exitosamente!")
+    launched = sum(process is not None for process in processes)
+    print(f"\n¡{launched} emuladores iniciados!")
     
-    # Esperar a que los emuladores se carguen completamente
-    print("Esperando 5 segundos para que los emuladores se carguen...")
-    time.sleep(5)
+    if win32gui is not None:
+        # Cada emulador se coloca y se da por listo en cuanto aparece su ventana y su primer frame
+        EMULATOR_HWNDS.clear()
+        ready = wait_for_emulators(processes, launch_timeout, timing, on_ready)
+        print(f"✓ {len(ready)}/{launched} emuladores listos y posicionados!")
+    else:
+        # Sin ventanas que sondear: una sola espera (arrancan en paralelo)
+        print(f"Esperando {launch_delay:.1f} segundos...")
+        time.sleep(launch_delay)
+        if on_ready is not None:
+            for i, process in enumerate(processes):
+                if process is not None:
+                    on_ready(i, process, None)
     
-    # Posicionar todas las ventanas
-    position_emulator_windows()
+    timing.save()
+    return processes
+
+def relanzar_emulador(index, timeout=None):
+    """
+    Abre de nuevo el emulador de la posición index y lo coloca en su sitio
+    Retorna (proceso, hwnd) o (None, None) si no llegó a estar listo
+    """
+    timing = get_timing_profile()
+    if timeout is None:
+        timeout = timing.timeout("emulator_ready", DELAY_BETWEEN_EMULATORS * 3)
     
-    print("✓ Emuladores listos y posicionados!")
+    try:
+        process = subprocess.Popen([EMULATOR_PATH + '.exe', ROM_PATH], shell=False)
+    except Exception as e:
+        print(f"✗ Error al relanzar emulador {index+1}: {e}")
+        return None, None
+    print(f"✓ Emulador {index+1} relanzado (PID: {process.pid})")
     
-    return processes
+    if win32gui is None:
+        time.sleep(timing.delay("emulator_ready", DELAY_BETWEEN_EMULATORS))
+        return process, None
+    
+    ready = wait_for_emulators({index: process}, timeout, timing)
+    timing.save()
+    if index not in ready:
+        detener_emulador(process)
+        return None, None
+    return process, ready[index]
+
+def detener_emulador(process, timeout=5.0):
+    """Termina un emulador (y lo mata si no responde); None = posición sin proceso"""
+    if process is None:
+        return
+    try:
+        process.terminate()
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    except Exception:
+        pass
 
 # Función para cerrar emuladores
 def cerrar_emuladores(processes):
@@ -139,6 +329,8 @@ def cerrar_emuladores(processes):
     print("Cerrando todos los emuladores...")
     
     for i, process in enumerate(processes):
+        if process is None:
+            continue
         try:
             process.terminate()
             print(f"✓ Emulador {i+1} cerrado")
@@ -170,17 +362,13 @@ if __name__ == "__main__":
         while True:
             time.sleep(1)
             
-            # Verificar si algún emulador se cerró
-            procesos_activos = []
+            # Verificar si algún emulador se cerró (su posición queda en None)
             for i, process in enumerate(procesos):
-                if process.poll() is None:  # Aún está ejecutándose
-                    procesos_activos.append(process)
-                else:
+                if process is not None and process.poll() is not None:
                     print(f"Emulador {i+1} se cerró")
+                    procesos[i] = None
             
-            procesos = procesos_activos
-            
-            if not procesos:
+            if not any(procesos):
                 print("Todos los emuladores se cerraron")
                 break
                 
@@ -9,32 +9,234 @@ import numpy as np
 import time
 import os
 import json
+import math
 import threading
 from concurrent.futures import ThreadPoolExecutor
+from frame_source import MSSFrameSource
+from file_watcher import FileWatcher
+from asset_bundle import load_bundle
+
+# Motores de puntuación disponibles (clave "scoring_engine" del JSON de configuración)
+SCORING_ENGINES = ("histogram", "palette")
+
+# Parámetros admitidos en la clave "palette" (además de shiny_reference_image y threshold)
+PALETTE_OPTIONS = ("top_k", "min_saturation", "min_value", "sample_step")
+
+# Decisiones de la detección secuencial
+NORMAL = "NORMAL"
+SHINY = "SHINY"
+UNDECIDED = "UNDECIDED"
+
+# Parámetros por defecto del SPRT (clave "sprt" del JSON de configuración)
+DEFAULT_SPRT_CONFIG = {
+    "alpha": 0.001,          # probabilidad de falsa alarma (normal declarado shiny)
+    "beta": 0.0001,          # probabilidad de perder un shiny
+    "mu_normal": 0.97,       # score medio de un frame normal
+    "mu_shiny": 0.70,        # score medio de un frame shiny
+    "sigma": 0.05,           # desviación del score por frame
+    "llr_clip": 4.0,         # evidencia máxima por frame: obliga a que varios frames coincidan
+    "timeout": 3.0,          # segundos máximos antes de devolver UNDECIDED
+    "frame_interval": 0.05   # pausa entre frames
+}
+
+
+class SequentialShinyTest:
+    """
+    Test secuencial de razón de probabilidades (SPRT) para un emulador.
+    Cada score suma log(p(score | shiny) / p(score | normal)) con modelo gaussiano;
+    se decide en cuanto la evidencia cruza los umbrales de Wald para alpha/beta.
+    """
+    
+    def __init__(self, alpha=0.001, beta=0.0001, mu_normal=0.97, mu_shiny=0.70, sigma=0.05, llr_clip=4.0):
+        self.upper = math.log((1.0 - beta) / alpha)   # cruzarlo -> SHINY
+        self.lower = math.log(beta / (1.0 - alpha))   # cruzarlo -> NORMAL
+        self.mu_normal = mu_normal
+        self.mu_shiny = mu_shiny
+        self.two_sigma_sq = 2.0 * sigma * sigma
+        self.llr_clip = llr_clip
+        self.llr = 0.0
+        self.frames = 0
+        self.score_sum = 0.0
+        self.decision = UNDECIDED
+    
+    def update(self, score):
+        """Añade el score de un frame y devuelve la decisión actual"""
+        if self.decision != UNDECIDED:
+            return self.decision
+        
+        llr = ((score - self.mu_normal) ** 2 - (score - self.mu_shiny) ** 2) / self.two_sigma_sq
+        self.llr += max(-self.llr_clip, min(self.llr_clip, llr))
+        self.frames += 1
+        self.score_sum += score
+        
+        if self.llr >= self.upper:
+            self.decision = SHINY
+        elif self.llr <= self.lower:
+            self.decision = NORMAL
+        return self.decision
+    
+    def mean_score(self):
+        """Media de los scores recibidos (None si no llegó ninguna captura válida)"""
+        return self.score_sum / self.frames if self.frames else None
+
+
+class PaletteShinyScorer:
+    """
+    Clasificador por paleta: el shiny solo cambia los colores del sprite.
+    Cada pixel pasa por una LUT color -> bucket de tono (12 sectores de 15° + 1 bucket
+    acromático para fondo/contornos) y solo se cuentan los pocos buckets que separan
+    al normal del shiny. El score es una similitud de Bray-Curtis en [0, 1] (1 = misma paleta
+    que la referencia) con su propio umbral (threshold), derivado de las referencias.
+    """
+    
+    HUE_BUCKETS = 12
+    ACHROMATIC_BUCKET = 12
+    MAX_BATCH = 255  # ids de frame en uint8 (calcHist exige la misma profundidad que los códigos)
+    
+    def __init__(self, reference_image, shiny_reference_image=None, top_k=3,
+                 min_saturation=60, min_value=50, sample_step=4):
+        self.sample_step = max(1, int(sample_step))
+        height, width = reference_image.shape[:2]
+        # Todas las capturas se muestrean a la misma rejilla que la referencia (alto, ancho)
+        self.sample_size = (max(1, height // self.sample_step), max(1, width // self.sample_step))
+        self.lut = self.build_lut(min_saturation, min_value)
+        self.frame_ids = {}
+        
+        self.reference_fractions = self.bucket_fractions(reference_image)
+        
+        # Buckets que separan normal de shiny: con referencia shiny, los de mayor diferencia;
+        # sin ella, los de mayor peso en la paleta normal
+        shiny_fractions = None
+        if shiny_reference_image is not None:
+            shiny_fractions = self.bucket_fractions(shiny_reference_image)
+            separation = np.abs(self.reference_fractions - shiny_fractions)
+        else:
+            separation = self.reference_fractions.copy()
+        separation[self.ACHROMATIC_BUCKET] = -1.0
+        self.buckets = np.argsort(-separation)[:int(top_k)]
+        self.reference_signature = self.reference_fractions[self.buckets]
+        self.reference_total = max(float(self.reference_signature.sum()), 1e-12)
+        
+        # Tabla 16x16x16 (B, G, R a 4 bits) -> código: i para el bucket seleccionado i, top_k para el resto
+        codes = np.full(self.lut.shape, len(self.buckets), dtype=np.float32)
+        for code, bucket in enumerate(self.buckets):
+            codes[self.lut == bucket] = code
+        # cv2.Mat sin wrap_channels: si no, OpenCV lee el array 3D como 16x16 con 16 canales
+        self.code_table = cv2.Mat(codes.reshape(16, 16, 16), wrap_channels=False)
+        
+        # Umbral a medio camino entre el score de la referencia normal (1) y el de la shiny;
+        # sin referencia shiny, el de una captura sin ninguno de los colores elegidos (0)
+        shiny_score = 0.0
+        if shiny_fractions is not None:
+            shiny_score = float(self.score_from_fractions(shiny_fractions[self.buckets]))
+        self.threshold = (1.0 + shiny_score) / 2.0
+    
+    @classmethod
+    def build_lut(cls, min_saturation, min_value):
+        """LUT de 4096 entradas (4 bits por canal BGR) -> bucket de tono"""
+        levels = np.arange(16, dtype=np.uint8) * 16 + 8  # centro de cada nivel cuantizado
+        b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+        colors = np.stack([b, g, r], axis=-1).reshape(1, -1, 3)
+        hsv = cv2.cvtColor(colors, cv2.COLOR_BGR2HSV).reshape(-1, 3)
+        
+        lut = (hsv[:, 0].astype(np.int64) * cls.HUE_BUCKETS // 180).astype(np.uint8)
+        achromatic = (hsv[:, 1] < min_saturation) | (hsv[:, 2] < min_value)
+        lut[achromatic] = cls.ACHROMATIC_BUCKET
+        return lut
+    
+    def sample(self, image, dst=None):
+        """Submuestreo (vecino más cercano) de la imagen a la rejilla de la referencia"""
+        height, width = self.sample_size
+        return cv2.resize(image[:, :, :3], (width, height), dst=dst, interpolation=cv2.INTER_NEAREST)
+    
+    def bucket_fractions(self, image):
+        """Fracción de pixels en cada bucket (histograma de 4096 colores cuantizados pasado por la LUT)"""
+        sampled = self.sample(image)
+        hist = cv2.calcHist([sampled], [0, 1, 2], None, [16, 16, 16], [0, 256, 0, 256, 0, 256]).reshape(-1)
+        return np.bincount(self.lut, weights=hist, minlength=self.HUE_BUCKETS + 1) / hist.sum()
+    
+    def score_from_fractions(self, fractions):
+        """
+        Similitud de Bray-Curtis con la referencia
+        fractions: fracción de pixels en cada bucket seleccionado (..., top_k)
+        """
+        difference = np.abs(fractions - self.reference_signature).sum(axis=-1)
+        return 1.0 - difference / (fractions.sum(axis=-1) + self.reference_total)
+    
+    def score(self, image):
+        """Score [0, 1] de una captura"""
+        if image is None:
+            return 0.0
+        return float(self.score_batch([image])[0])
+    
+    def score_batch(self, frames):
+        """
+        Score de varias capturas sin histogramas por frame: cada una se submuestrea dentro de
+        un único stack, un calcBackProject lo traduce a códigos de bucket y un calcHist 2D
+        (código x frame) cuenta todos los frames a la vez. Por frame solo queda un resize,
+        el resto son dos llamadas en C para todo el batch
+        """
+        if len(frames) > self.MAX_BATCH:
+            return np.concatenate([self.score_batch(frames[i:i + self.MAX_BATCH])
+                                   for i in range(0, len(frames), self.MAX_BATCH)])
+        
+        n = len(frames)
+        height, width = self.sample_size
+        stack = np.empty((n * height, width, 3), dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            cv2.resize(frame, (width, height), dst=stack[i * height:(i + 1) * height],
+                       interpolation=cv2.INTER_NEAREST)
+        
+        # Imagen con el índice de frame de cada pixel (una por tamaño de batch)
+        ids = self.frame_ids.get(n)
+        if ids is None:
+            ids = np.repeat(np.arange(n, dtype=np.uint8), height * width).reshape(n * height, width)
+            self.frame_ids[n] = ids
+        
+        k = len(self.buckets)
+        codes = cv2.calcBackProject([stack], [0, 1, 2], self.code_table, [0, 256, 0, 256, 0, 256], 1)
+        counts = cv2.calcHist([codes, ids], [0, 1], None, [k + 1, n], [0, k + 1, 0, n])
+        return self.score_from_fractions(counts[:k].T / (height * width))
+
 
 class MultiEmulatorShinyDetector:
-    def __init__(self, reference_image_path=None, config_path="coordinates/emulator_coordinates.json"):
+    def __init__(self, reference_image_path=None, config_path="coordinates/emulator_coordinates.json", frame_source=None):
         """
         Detector de shinies para múltiples emuladores simultáneamente
+        frame_source: fuente de frames (ver frame_source.py); por defecto captura en vivo con mss
         """
         self.reference_image = None
+        self.reference_profile = None  # Datos precalculados de la referencia (histogramas, tamaños)
         self.emulator_windows = []
         self.capture_regions = []
+        self.union_region = None
         self.is_running = False
         self.config_path = config_path
         self.config = None
+        self.similarity_threshold = 0.90
+        self.scoring_engine = "histogram"
+        self.palette_config = {}
+        self.sprt_config = dict(DEFAULT_SPRT_CONFIG)
+        self.frame_source = frame_source
         
         # Cargar configuración de coordenadas
         self.load_coordinates_config()
         
         if reference_image_path and os.path.exists(reference_image_path):
             self.load_reference_image(reference_image_path)
+        
+        # Configuración y referencias vigiladas para recargarlas en caliente (reload_if_changed)
+        self.watcher = FileWatcher(self.watched_files())
     
     def load_coordinates_config(self):
         """Carga la configuración de coordenadas desde el archivo JSON"""
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
                 self.config = json.load(f)
+            self.similarity_threshold = self.config.get('similarity_threshold', self.similarity_threshold)
+            self.palette_config = self.config.get('palette', {})
+            self.sprt_config = dict(DEFAULT_SPRT_CONFIG, **self.config.get('sprt', {}))
+            self.set_scoring_engine(self.config.get('scoring_engine', 'histogram'))
             print(f"✅ Configuración cargada desde {self.config_path}")
             self.update_capture_regions()
             return True
@@ -51,6 +253,7 @@ class MultiEmulatorShinyDetector:
     def update_capture_regions(self):
         """Actualiza las regiones de captura usando la configuración cargada"""
         self.capture_regions = []
+        self.union_region = None
         
         if not self.config or 'emulators' not in self.config:
             print("❌ No hay configuración de emuladores disponible")
@@ -70,8 +273,31 @@ class MultiEmulatorShinyDetector:
             }
             self.capture_regions.append(region)
         
+        self.union_region = self.compute_union_region(self.capture_regions)
         print(f"✅ {len(self.capture_regions)} regiones de captura configuradas")
     
+    def set_scoring_engine(self, engine):
+        """Selecciona el motor de puntuación ("histogram" o "palette")"""
+        if engine not in SCORING_ENGINES:
+            print(f"⚠️  Motor de puntuación desconocido '{engine}', usando 'histogram'")
+            engine = "histogram"
+        self.scoring_engine = engine
+        # El perfil de referencia depende del motor: se reconstruye al pedirlo
+        self.reference_profile = None
+    
+    @staticmethod
+    def compute_union_region(regions):
+        """Calcula el bounding box que contiene todas las regiones de captura"""
+        if not regions:
+            return None
+        
+        left = min(r['left'] for r in regions)
+        top = min(r['top'] for r in regions)
+        right = max(r['left'] + r['width'] for r in regions)
+        bottom = max(r['top'] + r['height'] for r in regions)
+        
+        return {"top": top, "left": left, "width": right - left, "height": bottom - top}
+    
     def load_reference_image(self, image_path=None):
         """Carga la imagen de referencia del Pokémon normal"""
         # Si no se especifica ruta, usar la de la configuración
@@ -81,46 +307,359 @@ class MultiEmulatorShinyDetector:
             image_path = 'reference/treecko_normal.png'
             
         try:
-            self.reference_image = cv2.imread(image_path)
+            # Invalidar el perfil anterior: la referencia va a cambiar
+            self.reference_profile = None
+            # Decodificada y con histogramas ya calculados en el bundle de assets (asset_bundle.py)
+            bundle = load_bundle(config_path=self.config_path)
+            self.reference_image = bundle.get(image_path, "bgr")
+            if self.reference_image is None:
+                self.reference_image = cv2.imread(image_path)
             if self.reference_image is None:
                 print(f"Error: No se pudo cargar la imagen {image_path}")
                 return False
+            self.reference_profile = self.build_reference_profile(self.reference_image, bundle.get(image_path, "hist"))
             print(f"✅ Imagen de referencia cargada: {image_path}")
             return True
         except Exception as e:
             print(f"Error cargando imagen de referencia: {e}")
             return False
     
-    def capture_region_from_emulator(self, emulator_id, sct_instance=None):
+    # Estado que se sustituye de golpe al recargar (regiones, umbrales y perfil de la referencia)
+    RELOADABLE_ATTRIBUTES = ("config", "similarity_threshold", "scoring_engine", "palette_config", "sprt_config",
+                             "capture_regions", "union_region", "reference_image", "reference_profile")
+    
+    def watched_files(self):
+        """Archivos de los que depende el detector: configuración e imágenes de referencia"""
+        config = self.config or {}
+        paths = [self.config_path, config.get('reference_image', 'reference/treecko_normal.png')]
+        paths.append(self.palette_config.get('shiny_reference_image'))
+        return paths
+    
+    def reload_if_changed(self):
+        """
+        Si la configuración o la referencia cambiaron en disco, prepara un detector nuevo
+        aparte y, solo si todo cargó bien, sustituye su estado de una vez
+        Pensado para llamarse entre ciclos; retorna True si se recargó
+        """
+        changed = self.watcher.poll()
+        if not changed:
+            return False
+        
+        print(f"🔄 Cambios en {', '.join(changed)}: recargando detector...")
+        fresh = MultiEmulatorShinyDetector(config_path=self.config_path, frame_source=self.frame_source)
+        if fresh.config is None or not fresh.load_reference_image():
+            print("⚠️  Recarga cancelada: se mantiene la configuración anterior")
+            return False
+        
+        for name in self.RELOADABLE_ATTRIBUTES:
+            setattr(self, name, getattr(fresh, name))
+        self.watcher.watch(self.watched_files())
+        print(f"✅ Detector recargado: {len(self.capture_regions)} regiones, umbral {self.similarity_threshold}")
+        return True
+    
+    @staticmethod
+    def calc_bgr_histograms(img):
+        """Histogramas de 256 bins de los canales B, G y R"""
+        return [cv2.calcHist([img], [channel], None, [256], [0, 256]) for channel in range(3)]
+    
+    def build_reference_profile(self, reference_image, hists=None):
+        """
+        Precalcula todo lo que depende solo de la referencia (una vez por carga):
+        histogramas normalizados y tamaño destino para redimensionar capturas
+        hists: histogramas normalizados (3 x 256 x 1) ya calculados, p.ej. del bundle de assets
+        """
+        if hists is not None:
+            hists = list(hists)
+        else:
+            pixels = float(reference_image.shape[0] * reference_image.shape[1])
+            hists = [hist / pixels for hist in self.calc_bgr_histograms(reference_image)]
+        
+        # Versión centrada (3 x 256) para la correlación vectorizada de score_batch
+        hist_matrix = np.stack([hist.ravel() for hist in hists]).astype(np.float64)
+        hists_centered = hist_matrix - hist_matrix.mean(axis=1, keepdims=True)
+        
+        palette = self.build_palette_scorer(reference_image) if self.scoring_engine == "palette" else None
+        if palette is not None:
+            # El score de paleta no es comparable con el de histogramas: umbral propio, derivado
+            # de las referencias salvo que "palette" lo fije con "threshold"
+            self.similarity_threshold = self.palette_config.get('threshold', palette.threshold)
+            print(f"🎨 Umbral del motor de paleta: {self.similarity_threshold:.3f}")
+        
+        return {
+            "image": reference_image,
+            "engine": self.scoring_engine,
+            "palette": palette,
+            "shape": reference_image.shape,
+            "dsize": (reference_image.shape[1], reference_image.shape[0]),
+            "hists": hists,
+            "hists_centered": hists_centered,
+            "hists_sq_norm": (hists_centered ** 2).sum(axis=1),
+            "resize_targets": {}  # forma de la captura -> dsize (o None si no hace falta)
+        }
+    
+    def build_palette_scorer(self, reference_image):
+        """Crea el clasificador por paleta con los parámetros de la clave "palette" del JSON"""
+        options = dict(self.palette_config)
+        shiny_path = options.pop('shiny_reference_image', None)
+        options.pop('threshold', None)  # lo aplica build_reference_profile
+        shiny_image = cv2.imread(shiny_path) if shiny_path and os.path.exists(shiny_path) else None
+        if shiny_path and shiny_image is None:
+            print(f"⚠️  No se pudo cargar la referencia shiny {shiny_path}, usando solo la normal")
+        
+        unknown = sorted(set(options) - set(PALETTE_OPTIONS))
+        if unknown:
+            print(f"⚠️  Opciones de \"palette\" desconocidas ignoradas: {', '.join(unknown)}")
+        options = {key: value for key, value in options.items() if key in PALETTE_OPTIONS}
+        try:
+            return PaletteShinyScorer(reference_image, shiny_reference_image=shiny_image, **options)
+        except (TypeError, ValueError) as e:
+            print(f"⚠️  Opciones de \"palette\" inválidas ({e}), usando los valores por defecto")
+            return PaletteShinyScorer(reference_image, shiny_reference_image=shiny_image)
+    
+    def get_reference_profile(self):
+        """Devuelve el perfil de la referencia actual, reconstruyéndolo si la referencia cambió"""
+        if self.reference_image is None:
+            return None
+        profile = self.reference_profile
+        if profile is None or profile["image"] is not self.reference_image or profile["engine"] != self.scoring_engine:
+            profile = self.build_reference_profile(self.reference_image)
+            self.reference_profile = profile
+        return profile
+    
+    def get_frame_source(self):
+        """Devuelve la fuente de frames del detector (crea una de mss si no hay ninguna)"""
+        if self.frame_source is None:
+            self.frame_source = MSSFrameSource()
+        return self.frame_source
+    
+    def capture_region_from_emulator(self, emulator_id, sct_instance=None, region=None):
         """
         Captura la región del Pokémon de un emulador específico
         NO guarda la imagen, solo la retorna en memoria
+        region: región a usar en lugar de la configurada (p.ej. la de antes de una recarga)
         """
-        if emulator_id >= len(self.capture_regions):
-            return None
-            
-        region = self.capture_regions[emulator_id]
+        if region is None:
+            if emulator_id >= len(self.capture_regions):
+                return None
+            region = self.capture_regions[emulator_id]
         
         try:
-            # Usar instancia de MSS específica del hilo o crear una nueva
+            # Usar la fuente específica del hilo (mss o FrameSource) o la del detector
             if sct_instance is None:
-                import mss
-                sct_instance = mss.mss()
+                sct_instance = self.get_frame_source()
             
             # Captura directa en memoria (SIN guardar archivo)
             screenshot = sct_instance.grab(region)
-            img = np.array(screenshot)
+            img = np.ascontiguousarray(screenshot)
             img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
             return img
         except Exception as e:
             print(f"Error capturando emulador {emulator_id}: {e}")
             return None
     
+    def capture_all_regions(self, sct_instance=None):
+        """
+        Captura TODAS las regiones con un solo grab del bounding box común
+        Retorna una imagen BGR por emulador (vistas de un único buffer BGR), o None si falla
+        """
+        if not self.capture_regions or self.union_region is None:
+            return None
+        
+        union = self.union_region
+        
+        try:
+            if sct_instance is None:
+                sct_instance = self.get_frame_source()
+            
+            # Un único grab por tick: el coste escala con el área, no con el número de emuladores
+            screenshot = sct_instance.grab(union)
+            frame = np.asarray(screenshot)  # BGRA, comparte memoria con el buffer de mss
+            
+            # Una vista [:, :, :3] del BGRA tiene 4 bytes entre pixels: cv2 no puede leerla tal cual
+            # y cada resize/calcHist la copiaba por dentro (con 4 ROIs de ~98x87, score_batch
+            # 0.78 ms en vez de 0.32 ms con histogramas y 0.24 ms en vez de 0.04 ms con paleta).
+            # Se pasa a BGR contiguo una vez por tick: el bounding box entero si las ROIs lo
+            # cubren casi todo y, si no (emuladores separados), solo cada ROI
+            rois_area = sum(region['width'] * region['height'] for region in self.capture_regions)
+            bgr = None
+            if 2 * rois_area >= union['width'] * union['height']:
+                bgr = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            
+            views = []
+            for region in self.capture_regions:
+                y = region['top'] - union['top']
+                x = region['left'] - union['left']
+                if bgr is not None:
+                    views.append(bgr[y:y + region['height'], x:x + region['width']])
+                else:
+                    roi = frame[y:y + region['height'], x:x + region['width']]
+                    views.append(cv2.cvtColor(roi, cv2.COLOR_BGRA2BGR))
+            return views
+        except Exception as e:
+            print(f"Error capturando regiones de emuladores: {e}")
+            return None
+    
+    @staticmethod
+    def resize_to_reference(image, profile):
+        """Redimensiona una captura al tamaño de la referencia (tamaño destino cacheado por forma)"""
+        resize_targets = profile["resize_targets"]
+        if image.shape not in resize_targets:
+            resize_targets[image.shape] = None if image.shape == profile["shape"] else profile["dsize"]
+        dsize = resize_targets[image.shape]
+        if dsize is not None:
+            image = cv2.resize(image, dsize)
+        return image
+    
+    @staticmethod
+    def stack_histograms(stack):
+        """
+        Histogramas N x 3 x 256 de un stack de ROIs (N x H x W x 3)
+        Un calcHist por ROI y canal: medido con benchmark_replay.py, más rápido que una sola
+        pasada de np.bincount sobre todo el stack con índices desplazados por ROI y canal
+        (con 32 ROIs de 98x87: 2.2 ms frente a 4.4-7.4 ms). El coste es lineal en el número
+        de ROIs con cualquiera de los dos: cada pixel se cuenta una vez
+        """
+        n = stack.shape[0]
+        hists = np.empty((n, 3, 256), dtype=np.float64)
+        for i in range(n):
+            for channel in range(3):
+                hists[i, channel] = cv2.calcHist([stack[i]], [channel], None, [256], [0, 256]).ravel()
+        return hists
+    
+    def score_batch(self, frames):
+        """
+        Calcula la similitud con la referencia de TODAS las capturas en una sola pasada
+        frames: lista de imágenes BGR (una por emulador, None si falló la captura)
+        Retorna un array con una similitud por frame (NaN para capturas inválidas: 0.0 es un score real)
+        """
+        similarities = np.full(len(frames), np.nan)
+        profile = self.get_reference_profile()
+        if profile is None:
+            return similarities
+        
+        valid = [i for i, frame in enumerate(frames) if frame is not None]
+        if not valid:
+            return similarities
+        
+        # Motor por paleta: un resize por frame y dos llamadas en C para todo el batch
+        if profile["palette"] is not None:
+            similarities[valid] = profile["palette"].score_batch([frames[i] for i in valid])
+            return similarities
+        
+        # Apilar todas las ROIs en un array N x H x W x 3
+        stack = np.stack([self.resize_to_reference(frames[i], profile) for i in valid])
+        n = len(valid)
+        
+        hists = self.stack_histograms(stack)
+        
+        # Correlación (equivalente a cv2.HISTCMP_CORREL) contra la referencia precalculada
+        hists_centered = hists - hists.mean(axis=2, keepdims=True)
+        numerator = (hists_centered * profile["hists_centered"]).sum(axis=2)
+        denominator = np.sqrt((hists_centered ** 2).sum(axis=2) * profile["hists_sq_norm"])
+        correlations = np.where(denominator > np.finfo(np.float64).eps,
+                                numerator / np.maximum(denominator, np.finfo(np.float64).eps), 1.0)
+        
+        similarities[valid] = np.maximum(0.0, correlations.mean(axis=1))
+        return similarities
+    
+    def check_all_emulators_for_shiny(self, similarity_threshold=None, sct_instance=None):
+        """
+        Verifica todos los emuladores con un grab y una pasada vectorizada
+        Retorna una lista de (is_shiny, similarity, image) por emulador (similarity None si falló la captura)
+        """
+        if similarity_threshold is None:
+            similarity_threshold = self.similarity_threshold
+        
+        if self.reference_image is None:
+            return [(False, None, None)] * len(self.capture_regions)
+        
+        views = self.capture_all_regions(sct_instance)
+        if views is None:
+            return [(False, None, None)] * len(self.capture_regions)
+        
+        similarities = self.score_batch(views)
+        return [(False, None, view) if np.isnan(similarity)
+                else (bool(similarity < similarity_threshold), float(similarity), view)
+                for similarity, view in zip(similarities, views)]
+    
+    def score_image(self, image, profile=None):
+        """
+        Similitud [0, 1] de una captura con la referencia usando el motor configurado
+        (None si no hay captura o referencia con la que compararla)
+        profile: perfil de referencia a usar en lugar del actual (p.ej. el de antes de una recarga)
+        """
+        profile = profile or self.get_reference_profile()
+        if profile is None or image is None:
+            return None
+        if profile["palette"] is not None:
+            return profile["palette"].score(image)
+        return self.compare_with_reference(image, profile)
+    
+    def detect_shiny_sequential(self, sct_instance=None, timeout=None):
+        """
+        Detección en streaming: consume frames de todos los emuladores y acumula evidencia
+        con un SPRT por emulador hasta que todos decidan, alguno sea SHINY o venza el timeout
+        Retorna una lista de (decision, mean_score, frames_usados, image) por emulador
+        """
+        config = self.sprt_config
+        if timeout is None:
+            timeout = config['timeout']
+        test_params = {key: config[key] for key in ("alpha", "beta", "mu_normal", "mu_shiny", "sigma", "llr_clip")}
+        
+        tests = [SequentialShinyTest(**test_params) for _ in self.capture_regions]
+        last_images = [None] * len(self.capture_regions)
+        
+        if self.reference_image is None or not tests:
+            return [(UNDECIDED, None, 0, None) for _ in tests]
+        
+        deadline = time.perf_counter() + timeout
+        while True:
+            views = self.capture_all_regions(sct_instance)
+            if views is not None:
+                scores = self.score_batch(views)
+                for emulator_id, test in enumerate(tests):
+                    # NaN = captura inválida: no aporta evidencia
+                    if test.decision == UNDECIDED and not np.isnan(scores[emulator_id]):
+                        test.update(float(scores[emulator_id]))
+                        last_images[emulator_id] = views[emulator_id]
+            
+            decisions = [test.decision for test in tests]
+            if SHINY in decisions or UNDECIDED not in decisions:
+                break
+            if time.perf_counter() + config['frame_interval'] > deadline:
+                break
+            time.sleep(config['frame_interval'])
+        
+        return [(test.decision, test.mean_score(), test.frames, image)
+                for test, image in zip(tests, last_images)]
+    
+    def compare_with_reference(self, image, profile=None):
+        """
+        Compara una captura con la referencia usando el perfil precalculado
+        Solo se calcula el histograma de la captura (None si no hay captura o referencia)
+        """
+        profile = profile or self.get_reference_profile()
+        if profile is None or image is None:
+            return None
+        
+        image = self.resize_to_reference(image, profile)
+        
+        hists = self.calc_bgr_histograms(image)
+        correlations = [cv2.compareHist(ref_hist, hist, cv2.HISTCMP_CORREL)
+                        for ref_hist, hist in zip(profile["hists"], hists)]
+        
+        similarity = sum(correlations) / 3.0
+        return max(0.0, similarity)
+    
     def compare_images_histogram(self, img1, img2):
         """Compara imágenes usando histogramas de color"""
         if img1 is None or img2 is None:
             return 0.0
         
+        # Comparación contra la referencia: usar el perfil precalculado
+        if img1 is self.reference_image:
+            return self.compare_with_reference(img2)
+        
         if img1.shape != img2.shape:
             img2 = cv2.resize(img2, (img1.shape[1], img1.shape[0]))
         
@@ -141,25 +680,27 @@ class MultiEmulatorShinyDetector:
         similarity = (corr_b + corr_g + corr_r) / 3.0
         return max(0.0, similarity)
     
-    def check_emulator_for_shiny(self, emulator_id, similarity_threshold=0.85, sct_instance=None):
+    def check_emulator_for_shiny(self, emulator_id, similarity_threshold=0.85, sct_instance=None, current_image=None):
         """
         Verifica si hay shiny en un emulador específico
         Retorna solo datos, NO guarda screenshots automáticamente
+        Si se pasa current_image (p.ej. una vista de capture_all_regions) no se vuelve a capturar
         """
         if self.reference_image is None:
-            return False, 0.0, None
+            return False, None, None
         
         # Capturar imagen actual (solo en memoria)
-        current_image = self.capture_region_from_emulator(emulator_id, sct_instance)
+        if current_image is None:
+            current_image = self.capture_region_from_emulator(emulator_id, sct_instance)
         
         if current_image is None:
-            return False, 0.0, None
+            return False, None, None
         
-        # Comparar con referencia
-        similarity = self.compare_images_histogram(self.reference_image, current_image)
+        # Comparar con referencia (perfil precalculado, motor configurado)
+        similarity = self.score_image(current_image)
         
         # Determinar si es shiny
-        is_shiny = similarity < similarity_threshold
+        is_shiny = similarity is not None and similarity < similarity_threshold
         
         return is_shiny, similarity, current_image
     
@@ -179,9 +720,8 @@ class MultiEmulatorShinyDetector:
         emulator_name = self.capture_regions[emulator_id]['window_title']
         check_count = 0
         
-        # Crear instancia de MSS específica para este hilo
-        import mss
-        sct_local = mss.mss()
+        # Crear fuente de frames específica para este hilo
+        sct_local = self.get_frame_source().for_thread()
         
         print(f"🎮 Iniciando monitoreo de {emulator_name} (Emulador {emulator_id+1})")
         
@@ -192,7 +732,10 @@ class MultiEmulatorShinyDetector:
                 
                 # Solo imprimir cada 20 verificaciones para no spam
                 if check_count % 20 == 0:
-                    print(f"Emulador {emulator_id+1}: Similitud {similarity:.3f} - {'SHINY!' if is_shiny else 'Normal'}")
+                    if similarity is None:
+                        print(f"Emulador {emulator_id+1}: sin captura")
+                    else:
+                        print(f"Emulador {emulator_id+1}: Similitud {similarity:.3f} - {'SHINY!' if is_shiny else 'Normal'}")
                 
                 if is_shiny:
                     print(f"\n🌟🌟🌟 ¡SHINY ENCONTRADO EN EMULADOR {emulator_id+1}! 🌟🌟🌟")
@@ -214,8 +757,9 @@ class MultiEmulatorShinyDetector:
                 print(f"Error monitoreando emulador {emulator_id}: {e}")
                 time.sleep(1)
         
-        # Cerrar instancia de MSS del hilo
-        sct_local.close()
+        # Cerrar la fuente del hilo (si no es la compartida)
+        if sct_local is not self.frame_source:
+            sct_local.close()
         return False
     
     def start_monitoring_all_emulators(self):
@@ -271,9 +815,8 @@ class MultiEmulatorShinyDetector:
         
         print("🧪 Probando captura de cada emulador...")
         
-        # Crear instancia de MSS para testing
-        import mss
-        sct_test = mss.mss()
+        # Fuente de frames para testing
+        sct_test = self.get_frame_source()
         
         for i in range(len(self.capture_regions)):
             print(f"\n📸 Capturando Emulador {i+1}...")
@@ -291,9 +834,6 @@ class MultiEmulatorShinyDetector:
                     cv2.destroyAllWindows()
             else:
                 print(f"❌ Error capturando Emulador {i+1}")
-        
-        # Cerrar instancia de testing
-        sct_test.close()
 
 
 # Ejemplo de uso standalone (opcional)
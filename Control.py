@@ -1,64 +1,326 @@
+import atexit
+import heapq
+import itertools
+import threading
 import time
-import pyautogui
+from collections import deque
+
+from input_backend import create_input_backend
 
 print('Vamos a testear el control y verificar que las teclas precionadas interacutan con el emulador')
 
+# Botón GBA (o atajo del emulador) -> tecla configurada en el emulador
+KEYS = {
+    "A": 'l',
+    "B": 'k',
+    "START": 'e',
+    "SELECT": 'r',
+    "UP": 'w',
+    "DOWN": 's',
+    "LEFT": 'a',
+    "RIGHT": 'd',
+    # Atajos del propio emulador (VBA-M): F1-F4 guardan, Shift+F1-F4 cargan save states
+    "SHIFT": 'shift',
+    "F1": 'f1',
+    "F2": 'f2',
+    "F3": 'f3',
+    "F4": 'f4',
+    "TURBO": 'space',   # acelerar (speed-up) mientras está pulsada
+}
+
+DEFAULT_HOLD = 0.1    # segundos con la tecla pulsada (6 frames del GBA)
+DEFAULT_GAP = 0.05    # segundos entre pulsaciones de una repetición
+SPIN_THRESHOLD = 0.002  # los últimos ms antes de un evento se esperan en activo (precisión sub-frame)
+DEFAULT_INPUT_BACKEND = "pyautogui"  # "pyautogui", "pynput" o "fake" (ver input_backend.py)
+
+
+class WaitFor:
+    """Paso de macro que detiene la secuencia hasta que predicate() sea True (o timeout)"""
+
+    def __init__(self, predicate, timeout=2.0, poll_interval=0.02):
+        self.predicate = predicate
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+
+def compile_macro(steps, hold=DEFAULT_HOLD, gap=DEFAULT_GAP):
+    """
+    Compila una lista de pasos a segmentos de timeline
+      "A"                   -> una pulsación
+      "A*5"                 -> cinco pulsaciones separadas por gap
+      "A+B+START+SELECT"    -> acorde (todas juntas)
+      "TURBO:DOWN"          -> solo pulsar (queda pulsada hasta un "TURBO:UP")
+      0.5                   -> pausa en segundos
+      WaitFor(predicate)    -> esperar a una condición (p.ej. un estado de pantalla)
+    Cada segmento es (eventos [(offset, "down"/"up", tecla)], duración) o un WaitFor
+    """
+    segments = []
+    events = []
+    t = 0.0
+
+    for step in steps:
+        if isinstance(step, WaitFor):
+            if events or t > 0:
+                segments.append((events, t))
+            segments.append(step)
+            events, t = [], 0.0
+            continue
+        if isinstance(step, (int, float)):
+            t += step
+            continue
+
+        name, _, edge = step.upper().partition(":")
+        if edge:
+            if edge not in ("DOWN", "UP"):
+                raise ValueError(f"Paso de macro inválido: {step}")
+            keys = [KEYS[button] for button in name.split("+")]
+            if edge == "UP":
+                keys.reverse()
+            events.extend((t, edge.lower(), key) for key in keys)
+            continue
+
+        name, _, count = step.upper().partition("*")
+        keys = [KEYS[button] for button in name.split("+")]
+        for i in range(int(count) if count else 1):
+            if i > 0:
+                t += gap
+            events.extend((t, "down", key) for key in keys)
+            t += hold
+            events.extend((t, "up", key) for key in reversed(keys))
+
+    if events or t > 0:
+        segments.append((events, t))
+    return segments
+
+
+class MacroHandle:
+    """Resultado de una macro encolada: done se activa al terminar (result False = timeout de un WaitFor)"""
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.done = threading.Event()
+        self.result = True
+        self.error = None
+
+    def wait(self, timeout=None):
+        """Bloquea hasta que la macro termine"""
+        return self.done.wait(timeout)
+
+
+class InputScheduler:
+    """
+    Hilo que ejecuta las macros en orden (FIFO) respetando los tiempos de su timeline
+    El llamador no se bloquea: puede capturar y detectar mientras las teclas están pulsadas
+    """
+
+    def __init__(self, backend=None):
+        # El backend por defecto se crea aquí y no al importar: sin display pyautogui falla
+        self.backend = backend or create_input_backend(DEFAULT_INPUT_BACKEND)
+        self.pressed = set()
+        self._heap = []               # (instante, orden, función)
+        self._sequence = itertools.count()
+        self._queue = deque()         # macros esperando turno
+        self._current = None
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="InputScheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, segments):
+        """Encola una macro compilada; retorna su MacroHandle"""
+        handle = MacroHandle(segments)
+        with self._cond:
+            self._queue.append(handle)
+            if self._current is None:
+                self._start_next()
+        return handle
+
+    def _push(self, due, function):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._sequence), function))
+            self._cond.notify()
+
+    def _start_next(self):
+        """Arranca la siguiente macro de la cola (llamar con el lock tomado)"""
+        if self._queue:
+            self._current = self._queue.popleft()
+            self._push(time.perf_counter(), lambda handle=self._current: self._run_segment(handle, 0))
+        else:
+            self._current = None
+
+    def _finish(self, handle):
+        handle.done.set()
+        with self._cond:
+            self._start_next()
+
+    def _run_segment(self, handle, index):
+        """Programa los eventos del segmento index a partir de ahora"""
+        if handle.done.is_set():
+            return  # cancelada (cancel)
+        if index >= len(handle.segments):
+            self._finish(handle)
+            return
+
+        start = time.perf_counter()
+        segment = handle.segments[index]
+        if isinstance(segment, WaitFor):
+            self._check_wait(handle, index, segment, start)
+            return
+
+        events, duration = segment
+        for offset, action, key in events:
+            self._push(start + offset, lambda action=action, key=key: self._send(action, key))
+        self._push(start + duration, lambda: self._run_segment(handle, index + 1))
+
+    def _check_wait(self, handle, index, wait, start):
+        """Evalúa la condición de un WaitFor y la vuelve a programar hasta que se cumpla"""
+        if handle.done.is_set():
+            return
+        try:
+            satisfied = wait.predicate()
+        except Exception as e:
+            handle.error = e
+            self._finish(handle)
+            return
+
+        now = time.perf_counter()
+        if satisfied or now - start >= wait.timeout:
+            if not satisfied:
+                handle.result = False
+            self._run_segment(handle, index + 1)
+        else:
+            self._push(now + wait.poll_interval, lambda: self._check_wait(handle, index, wait, start))
+
+    def _send(self, action, key):
+        try:
+            if action == "down":
+                self.backend.key_down(key)
+                self.pressed.add(key)
+            else:
+                self.backend.key_up(key)
+                self.pressed.discard(key)
+        except Exception as e:
+            if self._current is not None:
+                self._current.error = e
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                due = self._heap[0][0]
+                remaining = due - time.perf_counter()
+                if remaining > SPIN_THRESHOLD:
+                    # Dormir hasta casi el instante (un evento nuevo más temprano despierta antes)
+                    self._cond.wait(remaining - SPIN_THRESHOLD)
+                    continue
+                _, _, function = heapq.heappop(self._heap)
+
+            while time.perf_counter() < due:
+                pass
+            function()
+
+    def release_all(self):
+        """Suelta las teclas que hayan quedado pulsadas"""
+        for key in list(self.pressed):
+            self._send("up", key)
+
+    def cancel(self):
+        """Descarta la macro en curso y las encoladas (quedan done con result False) y suelta las teclas"""
+        with self._cond:
+            pending = ([self._current] if self._current is not None else []) + list(self._queue)
+            self._heap.clear()
+            self._queue.clear()
+            self._current = None
+        for handle in pending:
+            handle.result = False
+            handle.done.set()
+        self.release_all()
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._queue.clear()
+            self._cond.notify()
+        self.release_all()
+
+
+_scheduler = None
+_backend = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Planificador de entrada compartido (se crea al primer uso)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InputScheduler(_backend)
+            atexit.register(_scheduler.close)
+        return _scheduler
+
+
+def set_input_backend(backend):
+    """Cambia el backend de entrada del planificador compartido"""
+    global _backend
+    with _scheduler_lock:
+        _backend = backend
+        if _scheduler is not None:
+            _scheduler.release_all()
+            _scheduler.backend = backend
+
+
+def get_input_backend():
+    """Backend de entrada en uso (None si aún no se ha enviado ninguna tecla)"""
+    return _scheduler.backend if _scheduler is not None else _backend
+
+
+def run_macro(steps, hold=DEFAULT_HOLD, gap=DEFAULT_GAP, wait=False):
+    """Compila y encola una macro; con wait=True bloquea hasta que termine"""
+    handle = get_scheduler().submit(compile_macro(steps, hold, gap))
+    if wait:
+        handle.wait()
+    return handle
+
+
+def press(button, times=1, hold=DEFAULT_HOLD, gap=DEFAULT_GAP):
+    """Pulsa un botón GBA times veces sin bloquear; retorna el MacroHandle"""
+    return run_macro([f"{button}*{times}"], hold, gap)
+
 
 def Press_A():
-    pyautogui.keyDown('l')
-    time.sleep(0.3)
-    pyautogui.keyUp('l')
+    return press("A")
 
 def Press_B():
-    pyautogui.keyDown('k')
-    time.sleep(0.3)
-    pyautogui.keyUp('k')
+    return press("B")
 
 def Press_Start():
-    pyautogui.keyDown('e')
-    time.sleep(0.3)
-    pyautogui.keyUp('e')
+    return press("START")
 
 def Press_Select():
-    pyautogui.keyDown('r')
-    time.sleep(0.3)
-    pyautogui.keyUp('r')
+    return press("SELECT")
 
 def Press_Arriba():
-    pyautogui.keyDown('w')
-    time.sleep(0.3)
-    pyautogui.keyUp('w')
+    return press("UP")
 
 def Press_Abajo():
-    pyautogui.keyDown('s')
-    time.sleep(0.3)
-    pyautogui.keyUp('s')
+    return press("DOWN")
 
 def Press_Izquierda():
-    pyautogui.keyDown('a')
-    time.sleep(0.3)
-    pyautogui.keyUp('a')
+    return press("LEFT")
 
 def Press_Derecha():
-    pyautogui.keyDown('d')
-    time.sleep(0.3)
-    pyautogui.keyUp('d')
+    return press("RIGHT")
 
 
 def SoftReset():
     print("Ejecutando Soft Reset (A + B + Start + Select)...")
-    
-    pyautogui.keyDown('l')  # A
-    pyautogui.keyDown('k')  # B
-    pyautogui.keyDown('e')  # Start
-    pyautogui.keyDown('r')  # Select
-    
-    time.sleep(0.2)  # 200ms suele ser suficiente
-    
-    # Soltar todas las teclas
-    pyautogui.keyUp('r')  # Select
-    pyautogui.keyUp('e')  # Start
-    pyautogui.keyUp('k')  # B
-    pyautogui.keyUp('l')  # A
-    
-    print("Soft Reset completado!")
\ No newline at end of file
+
+    # Las cuatro teclas juntas 200ms (suele ser suficiente); se sueltan en orden inverso
+    handle = run_macro(["A+B+START+SELECT"], hold=0.2)
+
+    print("Soft Reset enviado!")
+    return handle
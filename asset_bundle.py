@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+asset_bundle.py - Templates, referencias y sus variantes precalculadas en un solo archivo
+Compila template/*.png, reference/*.png (y las referencias que nombre la configuración)
+en coordinates/assets.bundle: por cada imagen la versión BGR decodificada (los templates a
+la escala de las ventanas de la cuadrícula, ver grid_layout.py), la gris, la
+reducida de la pirámide y los histogramas normalizados; por cada template, además, sus
+espectros FFT para cada tamaño de frame usado. Al arrancar se abre con mmap (sin decodificar
+PNGs ni repetir DFTs) y solo se recompila si cambia el hash de algún archivo fuente.
+
+Formato: MAGIC + longitud de la cabecera (uint64) + cabecera JSON + arrays en crudo
+alineados a 64 bytes a partir del primer múltiplo de 64 tras la cabecera. La cabecera
+guarda versión, hashes de las fuentes, parámetros (escala de la pirámide, tamaños de
+frame) y dtype/forma/offset de cada array.
+
+Uso: python asset_bundle.py [--frame-size 800x600] [--pyramid-scale 0.25] [--force]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import struct
+import threading
+
+import cv2
+import numpy as np
+
+from fft_matcher import FFTTemplateBank
+from grid_layout import template_scale
+
+BUNDLE_PATH = "coordinates/assets.bundle"
+CONFIG_PATH = "coordinates/emulator_coordinates.json"
+SOURCE_DIRS = ("template", "reference")
+BUNDLE_VERSION = 1
+MAGIC = b"PKBUNDLE"
+ALIGNMENT = 64
+DEFAULT_PYRAMID_SCALE = 0.25
+DEFAULT_FRAME_SHAPE = (600, 800)    # (alto, ancho) de la región de captura por defecto del navegador
+
+_bundles = {}                       # ruta -> AssetBundle abierto (compartido por navegadores y detector)
+_lock = threading.Lock()
+
+
+def asset_key(path):
+    """Ruta normalizada con '/' para que 'template\\x.png' y './template/x.png' coincidan"""
+    return os.path.normpath(path).replace("\\", "/")
+
+
+def spectrum_variant(frame_shape):
+    return "spectrum@%dx%d" % tuple(frame_shape[:2])
+
+
+def read_config(config_path):
+    """Configuración de coordinates/ ({} si falta o está a medio escribir)"""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def source_files(config_path=CONFIG_PATH):
+    """
+    Archivos de los que se compila el bundle (la configuración decide qué referencias entran)
+    El JSON en sí no es fuente: cambiar umbrales o regiones no recompila nada
+    """
+    sources = set()
+    for directory in SOURCE_DIRS:
+        sources.update(asset_key(path) for path in glob.glob(os.path.join(directory, "*.png")))
+    config = read_config(config_path)
+    palette = config.get("palette")
+    shiny_reference = palette.get("shiny_reference_image") if isinstance(palette, dict) else None
+    for path in (config.get("reference_image"), shiny_reference):
+        if path and os.path.exists(path):
+            sources.add(asset_key(path))
+    return sorted(sources)
+
+
+def hash_files(paths):
+    """Ruta -> sha256 del contenido"""
+    hashes = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def scale_image(image, scale):
+    """Imagen redimensionada a scale (la misma si scale es 1)"""
+    if scale == 1.0:
+        return image
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def compile_arrays(sources, pyramid_scale, frame_shapes, templates_scale=1.0):
+    """
+    Decodifica las imágenes de sources y calcula sus variantes -> {"ruta:variante": array}
+    Los templates se guardan ya redimensionados a templates_scale (ventanas de la cuadrícula)
+    """
+    arrays = {}
+    for path in sources:
+        if not path.lower().endswith(".png"):
+            continue
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        if path.startswith("template/"):
+            image = scale_image(image, templates_scale)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        pixels = float(image.shape[0] * image.shape[1])
+        arrays[f"{path}:bgr"] = image
+        arrays[f"{path}:gray"] = gray
+        arrays[f"{path}:coarse"] = cv2.resize(gray, None, fx=pyramid_scale, fy=pyramid_scale,
+                                              interpolation=cv2.INTER_AREA)
+        arrays[f"{path}:hist"] = np.stack([cv2.calcHist([image], [c], None, [256], [0, 256]) / pixels
+                                           for c in range(3)])
+        if path.startswith("template/"):
+            for frame_shape in frame_shapes:
+                spectra = FFTTemplateBank({path: image}, frame_shape).spectra.get(path)
+                if spectra is not None:
+                    arrays[f"{path}:{spectrum_variant(frame_shape)}"] = np.stack(spectra)
+    return arrays
+
+
+def aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def write_bundle(path, header, arrays):
+    """Escribe el bundle en un temporal y lo sustituye de una vez"""
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += aligned(array.nbytes)
+    encoded = json.dumps(dict(header, arrays=entries)).encode('utf-8')
+    data_start = aligned(len(MAGIC) + 8 + len(encoded))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(encoded)))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, path)
+
+
+class AssetBundle:
+    """Arrays de un bundle (vistas de solo lectura sobre el mmap, o en memoria)"""
+
+    def __init__(self, path=None, header=None, arrays=None):
+        self.path = path
+        self.header = header or {}
+        self.arrays = arrays or {}
+
+    @classmethod
+    def open(cls, path):
+        """Abre el bundle con mmap; None si no existe, está corrupto o es de otra versión"""
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                (length,) = struct.unpack("<Q", f.read(8))
+                header = json.loads(f.read(length).decode('utf-8'))
+            data_start = aligned(len(MAGIC) + 8 + length)
+            if header.get("version") != BUNDLE_VERSION:
+                return None
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+            arrays = {}
+            for name, entry in header["arrays"].items():
+                dtype = np.dtype(entry["dtype"])
+                count = int(np.prod(entry["shape"], dtype=np.int64))
+                start = data_start + entry["offset"]
+                arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(entry["shape"])
+            return cls(path, header, arrays)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+    @property
+    def hashes(self):
+        return self.header.get("sources", {})
+
+    @property
+    def pyramid_scale(self):
+        return self.header.get("pyramid_scale")
+
+    @property
+    def template_scale(self):
+        return self.header.get("template_scale", 1.0)
+
+    @property
+    def frame_shapes(self):
+        return [tuple(shape) for shape in self.header.get("frame_shapes", [])]
+
+    def get(self, source, variant):
+        """Variante ("bgr", "gray", "coarse", "hist", spectrum_variant(...)) de un archivo, o None"""
+        return self.arrays.get(f"{asset_key(source)}:{variant}")
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+
+def build_bundle(path, sources, hashes, pyramid_scale, frame_shapes, templates_scale=1.0):
+    """Compila y escribe el bundle; si no se puede escribir se usa en memoria"""
+    frame_shapes = sorted({tuple(shape) for shape in frame_shapes})
+    arrays = compile_arrays(sources, pyramid_scale, frame_shapes, templates_scale)
+    header = {"version": BUNDLE_VERSION, "sources": hashes, "pyramid_scale": pyramid_scale,
+              "template_scale": templates_scale, "frame_shapes": [list(shape) for shape in frame_shapes]}
+    try:
+        write_bundle(path, header, arrays)
+    except OSError as e:
+        # En Windows no se puede sustituir un archivo que sigue mapeado (recarga en caliente)
+        print(f"⚠️  No se pudo guardar {path} ({e}): se usa en memoria hasta el próximo arranque")
+        return AssetBundle(None, dict(header, arrays={}), arrays)
+    return AssetBundle.open(path) or AssetBundle(None, header, arrays)
+
+
+def load_bundle(path=BUNDLE_PATH, config_path=CONFIG_PATH, pyramid_scale=None, frame_shape=None,
+                templates_scale=None):
+    """
+    Bundle al día con las fuentes: lo abre con mmap y solo lo recompila si cambió el hash
+    de alguna fuente, la escala de la pirámide o de los templates, o falta el tamaño de frame pedido
+    Sin pyramid_scale/frame_shape se aceptan los que tenga el bundle; sin templates_scale se
+    usa la de la cuadrícula de la configuración
+    Nunca falla: ante un error retorna un bundle vacío (se cargan los PNGs como siempre)
+    """
+    with _lock:
+        try:
+            sources = source_files(config_path)
+            hashes = hash_files(sources)
+            bundle = _bundles.get(path) or AssetBundle.open(path)
+            frame_shape = tuple(frame_shape[:2]) if frame_shape is not None else None
+
+            if bundle is not None:
+                scale = pyramid_scale or bundle.pyramid_scale
+                shapes = set(bundle.frame_shapes)
+            else:
+                scale = pyramid_scale or DEFAULT_PYRAMID_SCALE
+                shapes = {DEFAULT_FRAME_SHAPE}
+            templates_scale = templates_scale or template_scale(read_config(config_path))
+            if (bundle is None or bundle.hashes != hashes or bundle.pyramid_scale != scale
+                    or bundle.template_scale != templates_scale
+                    or (frame_shape is not None and frame_shape not in shapes)):
+                if frame_shape is not None:
+                    shapes.add(frame_shape)
+                print(f"📦 Compilando {path} ({len(sources)} archivos)...")
+                bundle = build_bundle(path, sources, hashes, scale, shapes, templates_scale)
+            _bundles[path] = bundle
+            return bundle
+        except Exception as e:
+            print(f"⚠️  Bundle de assets no disponible ({e}): cargando PNGs")
+            return AssetBundle()
+
+
+def parse_size(text):
+    """'800x600' -> (alto, ancho)"""
+    width, height = text.lower().split("x")
+    return int(height), int(width)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila templates y referencias en un bundle con mmap")
+    parser.add_argument("--bundle", default=BUNDLE_PATH)
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--frame-size", action="append", default=[],
+                        help="tamaño de la región de captura, p.ej. 800x600 (repetible)")
+    parser.add_argument("--pyramid-scale", type=float, default=None)
+    parser.add_argument("--force", action="store_true", help="recompilar aunque no haya cambios")
+    args = parser.parse_args()
+
+    previous = None if args.force else AssetBundle.open(args.bundle)
+    shapes = {parse_size(size) for size in args.frame_size}
+    if not shapes:
+        shapes = set(previous.frame_shapes) if previous is not None else {DEFAULT_FRAME_SHAPE}
+    scale = args.pyramid_scale or (previous.pyramid_scale if previous is not None else None) or DEFAULT_PYRAMID_SCALE
+    templates_scale = template_scale(read_config(args.config))
+
+    sources = source_files(args.config)
+    hashes = hash_files(sources)
+    if (previous is not None and previous.hashes == hashes and previous.pyramid_scale == scale
+            and previous.template_scale == templates_scale and shapes <= set(previous.frame_shapes)):
+        print(f"✅ {args.bundle} ya está al día ({len(previous.arrays)} arrays, {previous.nbytes() / 1e6:.1f} MB)")
+        return
+
+    bundle = build_bundle(args.bundle, sources, hashes, scale, shapes | set(previous.frame_shapes if previous else ()),
+                          templates_scale)
+    for source in sources:
+        variants = sorted(name.split(":", 1)[1] for name in bundle.arrays if name.startswith(source + ":"))
+        if variants:
+            print(f"🖼️  {source}: {', '.join(variants)}")
+    print(f"💾 {args.bundle}: {len(bundle.arrays)} arrays, {bundle.nbytes() / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,16 @@ y prepararlos para configuración de coordenadas
 
 import win32gui
 import win32con
-import mss
 import cv2
 import numpy as np
 import os
 import time
 from datetime import datetime
+from frame_source import MSSFrameSource
 
 class EmulatorScreenshotTaker:
-    def __init__(self):
-        self.sct = mss.mss()
+    def __init__(self, frame_source=None):
+        self.frame_source = frame_source if frame_source is not None else MSSFrameSource()
         self.emulator_windows = []
         self.screenshots_taken = []
         
@@ -76,12 +76,8 @@ class EmulatorScreenshotTaker:
                 "height": bottom - top
             }
             
-            # Tomar screenshot
-            screenshot = self.sct.grab(region)
-            
-            # Convertir a formato OpenCV
-            img = np.array(screenshot)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+            # Tomar screenshot (ya en formato OpenCV)
+            img = self.frame_source.grab_bgr(region)
             
             # Guardar imagen
             cv2.imwrite(output_path, img)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+benchmark_replay.py - Mide el camino de detección y navegación usando frames de disco
+No necesita emuladores ni display: funciona en Linux headless y sin límite de velocidad
+
+Uso:
+  python benchmark_replay.py                          # img_treecko/ sin límite de velocidad
+  python benchmark_replay.py --source rec:grabacion.npz --frames 500
+  python benchmark_replay.py --fps 60                 # simular una fuente a 60 fps
+  python benchmark_replay.py --dialog-source rec:dialogos.npz  # diálogos grabados con FrameRecorder
+"""
+
+import argparse
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from frame_source import create_frame_source
+from Comparar_Imagen import MultiEmulatorShinyDetector
+from main import GameNavigator, MATCH_MODES
+from fft_matcher import FFTTemplateBank
+
+def benchmark_detector(source_spec, frames, fps):
+    """Mide captura + comparación de histogramas de todos los emuladores por tick"""
+    source = create_frame_source(source_spec, fps=fps)
+    detector = MultiEmulatorShinyDetector(frame_source=source)
+    detector.load_reference_image()
+
+    if not detector.capture_regions or detector.reference_image is None:
+        print("❌ Detector sin regiones o sin imagen de referencia")
+        return
+
+    print(f"\n🔍 DETECTOR ({len(detector.capture_regions)} emuladores, {frames} ticks)")
+
+    # Camino serie: una comparación por emulador
+    similarities = []
+    start = time.perf_counter()
+    for _ in range(frames):
+        views = detector.capture_all_regions()
+        for emulator_id, view in enumerate(views):
+            _, similarity, _ = detector.check_emulator_for_shiny(emulator_id, current_image=view)
+            if similarity is not None:
+                similarities.append(similarity)
+    elapsed = time.perf_counter() - start
+    print(f"   ⏱️  Serie: {elapsed:.3f} s total - {elapsed / frames * 1000:.2f} ms/tick - {frames / elapsed:.1f} ticks/s")
+
+    # Camino batch: todos los emuladores en una llamada
+    start = time.perf_counter()
+    for _ in range(frames):
+        detector.check_all_emulators_for_shiny()
+    elapsed = time.perf_counter() - start
+    print(f"   ⏱️  Batch: {elapsed:.3f} s total - {elapsed / frames * 1000:.2f} ms/tick - {frames / elapsed:.1f} ticks/s")
+    print(f"   📊 Similitud: min {min(similarities):.3f} - max {max(similarities):.3f}")
+    benchmark_histograms(detector)
+    benchmark_engines(detector)
+
+
+def bincount_histograms(stack):
+    """Histogramas N x 3 x 256 en una sola pasada de np.bincount (alternativa a stack_histograms)"""
+    n = stack.shape[0]
+    offsets = (np.arange(n)[:, None] * 768 + np.arange(3) * 256).astype(np.uint16)
+    indices = stack.reshape(n, -1, 3) + offsets[:, None, :]
+    return np.bincount(indices.ravel(), minlength=n * 768).reshape(n, 3, 256).astype(np.float64)
+
+
+def benchmark_histograms(detector, repeats=50):
+    """Histogramas del motor "histogram" para 4-32 ROIs: calcHist por ROI frente a un bincount"""
+    reference = detector.reference_image
+    print(f"\n📊 HISTOGRAMAS DEL BATCH (ROI {reference.shape[1]}x{reference.shape[0]}, {repeats} repeticiones)")
+    for n in (4, 16, 32):
+        stack = np.stack([reference] * n)
+        timings = []
+        for function in (detector.stack_histograms, bincount_histograms):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                function(stack)
+            timings.append((time.perf_counter() - start) / repeats * 1000)
+        print(f"   ⏱️  {n:2d} ROIs: calcHist {timings[0]:.2f} ms - bincount {timings[1]:.2f} ms")
+
+
+def benchmark_engines(detector, repeats=50, rounds=10):
+    """
+    score_batch de 4-32 ROIs con el motor de histogramas frente al de paleta
+    Se toma la mejor de varias rondas: con ROIs tan pequeñas el ruido del sistema pesa más que la medida
+    """
+    reference = detector.reference_image
+    engine = detector.scoring_engine
+    print(f"\n🎨 MOTORES DE SCORE (ROI {reference.shape[1]}x{reference.shape[0]}, mejor de {rounds} x {repeats})")
+    for n in (4, 16, 32):
+        frames = [reference] * n
+        timings = []
+        for detector.scoring_engine in ("histogram", "palette"):
+            detector.score_batch(frames)  # construye el perfil fuera de la medida
+            best = float("inf")
+            for _ in range(rounds):
+                start = time.perf_counter()
+                for _ in range(repeats):
+                    detector.score_batch(frames)
+                best = min(best, (time.perf_counter() - start) / repeats * 1000)
+            timings.append(best)
+        print(f"   ⏱️  {n:2d} ROIs: histogramas {timings[0]:.3f} ms - paleta {timings[1]:.3f} ms "
+              f"({timings[0] / timings[1]:.1f}x)")
+    detector.scoring_engine = engine
+
+
+def benchmark_navigator(source_spec, frames, fps):
+    """Mide captura + detección de pantalla del navegador por poll, con y sin índice de huellas"""
+    for use_screen_hash in (False, True):
+        navigator = GameNavigator()
+        navigator.use_screen_hash = use_screen_hash
+        region = navigator.capture_region
+        # Los frames de disco se colocan en el origen de la región de navegación
+        navigator.frame_source = create_frame_source(source_spec, fps=fps, origin=(region['left'], region['top']))
+
+        states = Counter()
+        start = time.perf_counter()
+        for _ in range(frames):
+            screenshot = navigator.capture_full_screen_region(region)
+            states[navigator.detect_current_screen(screenshot)] += 1
+        elapsed = time.perf_counter() - start
+
+        label = "con huellas" if use_screen_hash else "sin huellas"
+        print(f"\n🎮 NAVEGADOR {label} ({len(navigator.templates)} templates, {frames} polls)")
+        print(f"   ⏱️  {elapsed:.3f} s total - {elapsed / frames * 1000:.2f} ms/poll - {frames / elapsed:.1f} polls/s")
+        print(f"   📊 Estados detectados: {dict(states)}")
+        if use_screen_hash:
+            index = navigator.screen_index
+            print(f"   🔑 Huellas: {index.hits}/{index.lookups} resueltas sin template matching ({len(index.states)} en el índice)")
+
+
+DIALOG_PAGES = ("Hi! Sorry to keep you waiting!", "Welcome to the world of POKeMON!",
+                "My name is BIRCH.", "But everyone calls me the POKeMON PROFESSOR.")
+
+
+def synthetic_dialog_frames(navigator, hold_polls=25, chars_per_poll=2):
+    """
+    Frames de diálogo sin ningún template (lo que más se sondea en navigate/select): una escena
+    fija con la caja de texto escribiéndose y luego quieta esperando la A, colocada donde el
+    navegador encontró la pantalla GBA
+    """
+    region = navigator.capture_region
+    height, width = next(iter(navigator.templates.values())).shape[:2]
+    scene = np.zeros((height, width, 3), np.uint8)
+    for i, y in enumerate(range(0, height, 24)):
+        scene[y:y + 24] = (40 + 12 * i, 90 + 8 * i, 60)
+    cv2.rectangle(scene, (width // 3, height // 6), (2 * width // 3, height // 2), (30, 60, 150), -1)
+    cv2.rectangle(scene, (4, height * 3 // 4), (width - 4, height - 4), (248, 248, 248), -1)
+
+    x, y = navigator.screen_origin
+    frames = []
+    for page in DIALOG_PAGES:
+        shown = list(range(chars_per_poll, len(page), chars_per_poll)) + [len(page)] * hold_polls
+        for count in shown:
+            screen = scene.copy()
+            cv2.putText(screen, page[:count], (12, height * 3 // 4 + 36), cv2.FONT_HERSHEY_SIMPLEX,
+                        0.6, (72, 72, 72), 2)
+            frame = np.zeros((region['height'], region['width'], 3), np.uint8)
+            frame[y:y + height, x:x + width] = screen
+            frames.append(frame)
+    return frames
+
+
+def benchmark_dialog_frames(frames, fps, dialog_source=None):
+    """
+    Polls sobre diálogos (ningún template en pantalla), con y sin índice de huellas:
+    las huellas UNKNOWN se verifican con los parches de los templates y el matching
+    en frame completo solo se hace cuando la huella no está en el índice
+    """
+    label = dialog_source or "sintéticos"
+    for use_screen_hash in (False, True):
+        navigator = GameNavigator()
+        navigator.use_screen_hash = use_screen_hash
+        region = navigator.capture_region
+
+        # Una pantalla conocida primero: posición de la pantalla GBA y ventana de las huellas
+        template = navigator.templates[navigator.IN_BATTLE]
+        primer = np.zeros((region['height'], region['width'], 3), np.uint8)
+        primer[40:40 + template.shape[0], 60:60 + template.shape[1]] = template
+        navigator.detect_current_screen(primer)
+
+        if dialog_source:
+            source = create_frame_source(dialog_source, fps=fps, origin=(region['left'], region['top']))
+            screenshots = [source.grab_bgr(region) for _ in range(frames)]
+        else:
+            screenshots = synthetic_dialog_frames(navigator)[:frames]
+
+        index = navigator.screen_index
+        index.hits = index.lookups = 0
+        states = Counter()
+        start = time.perf_counter()
+        for screenshot in screenshots:
+            states[navigator.detect_current_screen(screenshot)] += 1
+        elapsed = time.perf_counter() - start
+
+        mode = "con huellas" if use_screen_hash else "sin huellas"
+        print(f"\n💬 DIÁLOGOS {label} {mode} ({len(screenshots)} polls)")
+        print(f"   ⏱️  {elapsed / len(screenshots) * 1000:.2f} ms/poll - estados: {dict(states)}")
+        if use_screen_hash:
+            print(f"   🔑 Huellas: {index.hits}/{index.lookups} resueltas sin matching en frame completo "
+                  f"({index.hits / max(index.lookups, 1) * 100:.0f}%, {len(index.states)} en el índice)")
+
+
+def benchmark_match_modes(source_spec, frames, fps):
+    """
+    Compara los modos de matching en frame completo (sin ventanas aprendidas):
+    tiempo por poll y coincidencia de estados contra el modo "full" (TM_CCOEFF_NORMED)
+    """
+    navigator = GameNavigator()
+    navigator.use_screen_hash = False  # medir solo el template matching
+    region = navigator.capture_region
+    source = create_frame_source(source_spec, fps=fps, origin=(region['left'], region['top']))
+    screenshots = [cv2.cvtColor(np.ascontiguousarray(source.grab(region)), cv2.COLOR_BGRA2BGR) for _ in range(frames)]
+
+    print(f"\n🧪 MODOS DE MATCHING EN FRAME COMPLETO ({frames} frames)")
+    reference_states = None
+    for mode in MATCH_MODES:
+        navigator.set_match_mode(mode)
+        states = []
+        start = time.perf_counter()
+        for screenshot in screenshots:
+            navigator.clear_search_windows()  # forzar el camino de frame completo
+            states.append(navigator.detect_current_screen(screenshot))
+        elapsed = time.perf_counter() - start
+
+        if reference_states is None:
+            reference_states = states
+        agreement = sum(a == b for a, b in zip(states, reference_states)) / len(states) * 100
+        print(f"   ⏱️  {mode:8s}: {elapsed / frames * 1000:.2f} ms/poll - coincidencia con 'full': {agreement:.1f}%")
+
+
+def benchmark_fft_crossover(source_spec, frames, fps):
+    """
+    Punto de cruce FFT vs cv2.matchTemplate en el frame de la región de navegación (800x600):
+    tiempo por frame para cada tamaño de template, con 1 y con 4 templates por frame.
+    El cruce se calcula a igualdad de trabajo: matchTemplate transforma el template en cada
+    llamada, así que la FFT "en frío" también recalcula sus espectros en cada frame. La columna
+    "fft cache" es el caso del navegador (espectros calculados una vez al cargar los templates)
+    """
+    navigator = GameNavigator()
+    region = navigator.capture_region
+    source = create_frame_source(source_spec, fps=fps, origin=(region['left'], region['top']))
+    screenshots = [source.grab_bgr(region) for _ in range(min(frames, 20))]
+    frame = screenshots[0]
+    sizes = [(8, 8), (16, 16), (32, 32), (64, 64), (128, 128), (192, 192), (256, 256), (255, 380)]
+
+    print(f"\n📐 CRUCE FFT vs matchTemplate ({frame.shape[1]}x{frame.shape[0]}, {len(screenshots)} frames)")
+    print(f"   {'template':>10s} {'n':>2s} {'matchTemplate':>14s} {'fft frío':>9s} {'fft cache':>10s}")
+    for count in (1, 4):
+        crossover = None
+        cached_crossover = None
+        for h, w in sizes:
+            # Templates recortados del propio frame en posiciones distintas
+            templates = {}
+            for i in range(count):
+                y = (i * 37) % (frame.shape[0] - h + 1)
+                x = (i * 53) % (frame.shape[1] - w + 1)
+                templates[i] = frame[y:y + h, x:x + w].copy()
+
+            start = time.perf_counter()
+            for screenshot in screenshots:
+                for template in templates.values():
+                    cv2.minMaxLoc(cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED))
+            spatial = (time.perf_counter() - start) / len(screenshots) * 1000
+
+            # Mismo trabajo que matchTemplate: espectros de los templates en cada frame
+            start = time.perf_counter()
+            for screenshot in screenshots:
+                FFTTemplateBank(templates, screenshot.shape).match_all(screenshot)
+            fft = (time.perf_counter() - start) / len(screenshots) * 1000
+
+            bank = FFTTemplateBank(templates, frame.shape)
+            start = time.perf_counter()
+            for screenshot in screenshots:
+                bank.match_all(screenshot)
+            cached = (time.perf_counter() - start) / len(screenshots) * 1000
+
+            if crossover is None and fft < spatial:
+                crossover = (h, w)
+            if cached_crossover is None and cached < spatial:
+                cached_crossover = (h, w)
+            print(f"   {f'{w}x{h}':>10s} {count:>2d} {spatial:>11.2f} ms {fft:>6.2f} ms {cached:>7.2f} ms")
+        label = f"{crossover[1]}x{crossover[0]}" if crossover else "ninguno"
+        cached_label = f"{cached_crossover[1]}x{cached_crossover[0]}" if cached_crossover else "ninguno"
+        print(f"   ➡️  Con {count} template(s) la FFT gana desde: {label} (con espectros en cache: {cached_label})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detección con frames de replay")
+    parser.add_argument("--source", default="dir:img_treecko",
+                        help="Fuente de frames: dir:<directorio> o rec:<archivo.npz>")
+    parser.add_argument("--frames", type=int, default=200, help="Frames a procesar por benchmark")
+    parser.add_argument("--fps", type=float, default=None, help="Ritmo fijo (por defecto sin límite)")
+    parser.add_argument("--dialog-source", default=None,
+                        help="Frames de diálogo grabados (dir:/rec:); por defecto se generan")
+    args = parser.parse_args()
+
+    print("📈 === BENCHMARK CON FRAMES DE REPLAY ===")
+    print(f"   Fuente: {args.source} - {'sin límite' if args.fps is None else f'{args.fps} fps'}")
+
+    benchmark_detector(args.source, args.frames, args.fps)
+    benchmark_navigator(args.source, args.frames, args.fps)
+    benchmark_dialog_frames(args.frames, args.fps, args.dialog_source)
+    benchmark_match_modes(args.source, args.frames, args.fps)
+    benchmark_fft_crossover(args.source, args.frames, args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,8 @@ class SimpleConfigBuilder:
         self.config = {
             "emulators": [],
             "reference_image": "reference/treecko_normal.png", 
-            "similarity_threshold": 0.85
+            "similarity_threshold": 0.85,
+            "scoring_engine": "histogram"
         }
         
         # Crear directorios
@@ -145,6 +146,57 @@ class SimpleConfigBuilder:
             print("❌ No se encontró la imagen de referencia")
             return False
     
+    def configure_emulators_automatically(self):
+        """Busca la referencia en todas las capturas de img_treecko/ (ver roi_discovery.py)"""
+        import glob
+        from roi_discovery import discover_rois, apply_to_config, MIN_SCORE
+        
+        screenshots = sorted(glob.glob("img_treecko/*.png"))
+        if not screenshots:
+            print("❌ No se encontraron screenshots en img_treecko/")
+            print("💡 Ejecuta auto_screenshot_emulators.py primero")
+            return False
+        
+        print(f"🔍 Buscando {self.config['reference_image']} en {len(screenshots)} capturas...")
+        try:
+            results = discover_rois(screenshots, self.config['reference_image'])
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            print("💡 Crea primero la imagen de referencia (opción 2)")
+            return False
+        
+        for path, found in sorted(results.items()):
+            if found is None or found['score'] < MIN_SCORE:
+                print(f"❌ {path}: no se encontró el Treecko")
+            else:
+                print(f"✅ {path}: ({found['x']}, {found['y']}) {found['width']}x{found['height']} "
+                      f"- correlación {found['score']:.3f}")
+        
+        updated = apply_to_config(self.config, results)
+        print(f"✅ {updated} emuladores configurados (guarda con la opción 3)")
+        return updated > 0
+    
+    def build_grid(self):
+        """Cuadrícula para N emuladores con las regiones derivadas de la del primer emulador (ver grid_layout.py)"""
+        from grid_layout import GridLayout, primary_monitor, reference_from_config
+        
+        reference_roi, reference_size = reference_from_config(self.config)
+        if reference_roi is None:
+            print("❌ Configura primero las coordenadas de un emulador (opción 1)")
+            return False
+        
+        try:
+            count = int(input("¿Cuántos emuladores? "))
+            layout = GridLayout(count, primary_monitor(), aspect=reference_size[0] / reference_size[1])
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        
+        self.config = layout.to_config(reference_roi, reference_size, base=self.config)
+        print(f"🧩 {layout.cols}x{layout.rows} ventanas de {layout.window_width}x{layout.window_height}")
+        print(f"✅ {count} emuladores configurados (guarda con la opción 3)")
+        return True
+    
     def save_config(self):
         """Guarda la configuración"""
         try:
@@ -208,6 +260,8 @@ def main():
         print("5. 🔄 Cargar configuración")
         print("6. ✅ Finalizar y continuar con detección")
         print("7. ❌ Salir")
+        print("8. 🧩 Cuadrícula automática para N emuladores")
+        print("9. 🔍 Detectar regiones automáticamente en img_treecko/")
         
         choice = input("\nElige opción: ").strip()
         
@@ -246,6 +300,12 @@ def main():
         elif choice == '7':
             break
             
+        elif choice == '8':
+            builder.build_grid()
+            
+        elif choice == '9':
+            builder.configure_emulators_automatically()
+            
         else:
             print("❌ Opción inválida")
 
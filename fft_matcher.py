@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+fft_matcher.py - Correlación de varios templates a la vez en el dominio de frecuencia
+Calcula lo mismo que cv2.matchTemplate(..., TM_CCOEFF_NORMED) para imágenes BGR:
+  numerador   = correlación del frame con el template centrado (sumada en los 3 canales)
+  denominador = normas del template centrado y de cada ventana del frame (imágenes integrales)
+
+Los espectros de los templates se calculan una sola vez por tamaño de frame. Cada frame
+necesita 3 DFT directas (una por canal) y una inversa por template: los productos de los
+3 canales se suman en frecuencia antes de invertir.
+"""
+
+import cv2
+import numpy as np
+
+
+class FFTTemplateBank:
+    """Banco de templates BGR con espectros precalculados para un tamaño de frame"""
+
+    def __init__(self, templates, frame_shape=None, spectra=None):
+        self.templates = {}           # clave -> (template centrado por canal (float32), suma de cuadrados)
+        for key, template in templates.items():
+            t = template.astype(np.float32)
+            centered = t - t.reshape(-1, 3).mean(axis=0)
+            self.templates[key] = (centered, float(np.sum(centered.astype(np.float64) ** 2)))
+        self.frame_shape = None
+        self.dft_shape = None
+        self.spectra = {}             # clave -> [espectro conjugable de cada canal]
+        if frame_shape is not None:
+            self.prepare(frame_shape, spectra)
+
+    def prepare(self, frame_shape, spectra=None):
+        """
+        Precalcula los espectros de todos los templates para frames de frame_shape (alto, ancho)
+        spectra: {clave: array (3, alto DFT, ancho DFT)} ya calculados (asset_bundle.py);
+                 los que falten o no tengan el tamaño esperado se calculan
+        """
+        frame_shape = tuple(frame_shape[:2])
+        if frame_shape == self.frame_shape:
+            return
+        self.frame_shape = frame_shape
+        self.dft_shape = (cv2.getOptimalDFTSize(frame_shape[0]), cv2.getOptimalDFTSize(frame_shape[1]))
+
+        self.spectra = {}
+        for key, (centered, _) in self.templates.items():
+            if centered.shape[0] > frame_shape[0] or centered.shape[1] > frame_shape[1]:
+                continue
+            known = spectra.get(key) if spectra else None
+            if known is not None and tuple(known.shape) == (3,) + self.dft_shape:
+                self.spectra[key] = list(known)
+            else:
+                self.spectra[key] = [self.forward(centered[:, :, c]) for c in range(3)]
+
+    def forward(self, channel):
+        """DFT de un canal rellenado con ceros hasta el tamaño óptimo"""
+        padded = np.zeros(self.dft_shape, dtype=np.float32)
+        padded[:channel.shape[0], :channel.shape[1]] = channel
+        return cv2.dft(padded)
+
+    def match_all(self, frame):
+        """
+        Correlaciona todos los templates contra el frame BGR
+        Retorna {clave: (confianza máxima, (x, y))}; los templates que no caben no aparecen
+        """
+        self.prepare(frame.shape)
+        frame_f = frame.astype(np.float32)
+        frame_spectra = [self.forward(frame_f[:, :, c]) for c in range(3)]
+
+        # Imágenes integrales: suma por canal y suma de cuadrados de los 3 canales juntos
+        sums = cv2.integral(frame, sdepth=cv2.CV_64F)
+        sqsums = cv2.integral(np.einsum('ijk,ijk->ij', frame_f, frame_f), sdepth=cv2.CV_64F)
+
+        results = {}
+        window_variances = {}         # (alto, ancho) -> varianza por ventana, compartida entre templates
+        for key, spectra in self.spectra.items():
+            centered, template_sq = self.templates[key]
+            h, w = centered.shape[:2]
+            out_h, out_w = frame.shape[0] - h + 1, frame.shape[1] - w + 1
+
+            product = cv2.mulSpectrums(frame_spectra[0], spectra[0], 0, conjB=True)
+            for c in (1, 2):
+                product += cv2.mulSpectrums(frame_spectra[c], spectra[c], 0, conjB=True)
+            numerator = cv2.idft(product, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)[:out_h, :out_w]
+
+            variance = window_variances.get((h, w))
+            if variance is None:
+                # Suma de las varianzas de cada canal: sum(I²) - sum(I)²/N
+                window_sum = sums[h:, w:] - sums[:-h, w:] - sums[h:, :-w] + sums[:-h, :-w]
+                window_sq = sqsums[h:, w:] - sqsums[:-h, w:] - sqsums[h:, :-w] + sqsums[:-h, :-w]
+                variance = window_sq - np.einsum('ijk,ijk->ij', window_sum, window_sum) / (h * w)
+                np.maximum(variance, 0.0, out=variance)
+                window_variances[(h, w)] = variance
+
+            # Ventanas planas (varianza ~0) puntúan 0 en vez de dividir por cero
+            denominator = np.sqrt(variance * template_sq).astype(np.float32)
+            scores = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 1e-3)
+            _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+            results[key] = (max_val, max_loc)
+        return results
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+file_watcher.py - Detecta cambios en archivos por su fecha de modificación (mtime)
+Lo usan el detector y el navegador para recargar configuración, referencia y templates
+entre ciclos sin reiniciar main.py.
+"""
+
+import os
+
+
+class FileWatcher:
+    """poll() devuelve los archivos que cambiaron (o aparecieron/desaparecieron) desde el anterior poll()"""
+
+    def __init__(self, paths=()):
+        self.mtimes = {}
+        self.watch(paths)
+
+    @staticmethod
+    def mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, paths):
+        """Sustituye la lista de archivos vigilados tomando su estado actual como referencia"""
+        self.mtimes = {path: self.mtime(path) for path in paths if path}
+
+    def poll(self):
+        changed = []
+        for path, previous in self.mtimes.items():
+            current = self.mtime(path)
+            if current != previous:
+                self.mtimes[path] = current
+                changed.append(path)
+        return changed
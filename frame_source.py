@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+frame_source.py - Fuentes de frames intercambiables para captura de pantalla
+Backends: pantalla en vivo (mss), directorio de PNGs y stream grabado (.npz)
+
+Todas las fuentes devuelven frames BGRA (alto x ancho x 4, uint8), igual que mss,
+para que el resto del código pueda tratarlas de la misma forma.
+"""
+
+import cv2
+import numpy as np
+import glob
+import os
+import threading
+import time
+
+
+def _region_key(region):
+    return (region['left'], region['top'], region['width'], region['height'])
+
+
+class FrameSource:
+    """Interfaz común: grab(region) devuelve un array BGRA de la región pedida"""
+
+    def grab(self, region):
+        """Captura una región {"top", "left", "width", "height"} en coordenadas de pantalla"""
+        raise NotImplementedError
+
+    def grab_bgr(self, region):
+        """Igual que grab() pero convertido a BGR (formato de OpenCV)"""
+        return cv2.cvtColor(np.ascontiguousarray(self.grab(region)), cv2.COLOR_BGRA2BGR)
+
+    def for_thread(self):
+        """Devuelve una fuente utilizable desde otro hilo (mss necesita una instancia por hilo)"""
+        return self
+
+    def close(self):
+        """Libera los recursos de la fuente"""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MSSFrameSource(FrameSource):
+    """Captura en vivo de la pantalla usando mss"""
+
+    def __init__(self):
+        import mss
+        self.sct = mss.mss()
+
+    def grab(self, region):
+        # np.asarray comparte memoria con el buffer de mss (sin copia)
+        return np.asarray(self.sct.grab(region))
+
+    def for_thread(self):
+        return MSSFrameSource()
+
+    def close(self):
+        self.sct.close()
+
+
+class ReplayFrameSource(FrameSource):
+    """
+    Base para fuentes de replay: cada grab() avanza un frame
+    fps=None -> sin límite de velocidad; fps=N -> ritmo fijo de N frames por segundo
+    """
+
+    def __init__(self, fps=None, loop=True, origin=(0, 0)):
+        self.fps = fps
+        self.loop = loop
+        self.origin = origin  # (left, top) en pantalla donde "vive" cada frame
+        self.index = 0
+        self.frames_served = 0
+        self._next_frame_time = None
+        self._lock = threading.Lock()
+
+    def frame_count(self):
+        raise NotImplementedError
+
+    def get_frame(self, index):
+        """Devuelve el frame BGRA completo número index"""
+        raise NotImplementedError
+
+    def next_frame(self):
+        """Devuelve el siguiente frame respetando el ritmo configurado"""
+        with self._lock:
+            total = self.frame_count()
+            if total == 0:
+                return None
+            if self.index >= total:
+                if not self.loop:
+                    return None
+                self.index = 0
+
+            # Ritmo fijo: esperar hasta que "llegue" el siguiente frame
+            if self.fps:
+                now = time.perf_counter()
+                if self._next_frame_time is None:
+                    self._next_frame_time = now
+                if self._next_frame_time > now:
+                    time.sleep(self._next_frame_time - now)
+                self._next_frame_time = max(self._next_frame_time, now) + 1.0 / self.fps
+
+            frame = self.get_frame(self.index)
+            self.index += 1
+            self.frames_served += 1
+            return frame
+
+    def grab(self, region):
+        frame = self.next_frame()
+        if frame is None:
+            raise RuntimeError("La fuente de replay no tiene más frames")
+        return self.crop(frame, region)
+
+    def crop(self, frame, region):
+        """Recorta la región del frame; lo que queda fuera del frame se rellena con negro"""
+        x = region['left'] - self.origin[0]
+        y = region['top'] - self.origin[1]
+        w = region['width']
+        h = region['height']
+        frame_h, frame_w = frame.shape[:2]
+
+        # Caso rápido: región completamente dentro del frame -> vista sin copia
+        if x >= 0 and y >= 0 and x + w <= frame_w and y + h <= frame_h:
+            return frame[y:y + h, x:x + w]
+
+        out = np.zeros((h, w, 4), dtype=np.uint8)
+        src_x0, src_y0 = max(x, 0), max(y, 0)
+        src_x1, src_y1 = min(x + w, frame_w), min(y + h, frame_h)
+        if src_x1 > src_x0 and src_y1 > src_y0:
+            out[src_y0 - y:src_y1 - y, src_x0 - x:src_x1 - x] = frame[src_y0:src_y1, src_x0:src_x1]
+        return out
+
+    def rewind(self):
+        """Vuelve al primer frame"""
+        with self._lock:
+            self.index = 0
+            self._next_frame_time = None
+
+
+class DirectoryFrameSource(ReplayFrameSource):
+    """Reproduce los PNGs de un directorio (p.ej. img_treecko/ o template/) en orden alfabético"""
+
+    def __init__(self, directory, pattern="*.png", fps=None, loop=True, origin=(0, 0)):
+        super().__init__(fps=fps, loop=loop, origin=origin)
+        self.directory = directory
+        self.paths = sorted(glob.glob(os.path.join(directory, pattern)))
+        self._cache = {}
+
+        if not self.paths:
+            print(f"⚠️  No se encontraron imágenes {pattern} en {directory}")
+
+    def frame_count(self):
+        return len(self.paths)
+
+    def get_frame(self, index):
+        # Decodificar cada PNG una sola vez
+        frame = self._cache.get(index)
+        if frame is None:
+            img = cv2.imread(self.paths[index], cv2.IMREAD_COLOR)
+            if img is None:
+                raise RuntimeError(f"No se pudo cargar {self.paths[index]}")
+            frame = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+            self._cache[index] = frame
+        return frame
+
+
+class RecordedFrameSource(ReplayFrameSource):
+    """Reproduce un stream grabado con FrameRecorder (.npz con frames BGRA)"""
+
+    def __init__(self, path, fps=None, loop=True):
+        data = np.load(path)
+        self.frames = data['frames']
+        self.timestamps = data['timestamps'] if 'timestamps' in data else None
+        origin = tuple(int(v) for v in data['origin']) if 'origin' in data else (0, 0)
+        super().__init__(fps=fps, loop=loop, origin=origin)
+        self.path = path
+
+    def frame_count(self):
+        return len(self.frames)
+
+    def get_frame(self, index):
+        return self.frames[index]
+
+
+class FrameRecorder(FrameSource):
+    """
+    Envuelve otra fuente y guarda cada frame capturado de una región fija
+    El resultado se puede reproducir luego con RecordedFrameSource
+    """
+
+    def __init__(self, source, region, max_frames=5000):
+        self.source = source
+        self.region = dict(region)
+        self._region_key = _region_key(region)
+        self.max_frames = max_frames
+        self.frames = []
+        self.timestamps = []
+
+    def grab(self, region):
+        frame = self.source.grab(region)
+        if _region_key(region) == self._region_key and len(self.frames) < self.max_frames:
+            self.frames.append(np.array(frame, copy=True))
+            self.timestamps.append(time.time())
+        return frame
+
+    def save(self, path):
+        """Guarda el stream grabado en un .npz"""
+        if not self.frames:
+            print("⚠️  No hay frames grabados")
+            return False
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path,
+                 frames=np.stack(self.frames),
+                 timestamps=np.array(self.timestamps),
+                 origin=np.array([self.region['left'], self.region['top']]))
+        print(f"💾 {len(self.frames)} frames grabados en {path}")
+        return True
+
+    def close(self):
+        self.source.close()
+
+
+def create_frame_source(spec="mss", fps=None, origin=(0, 0)):
+    """
+    Crea una fuente a partir de una especificación de texto:
+      "mss"               -> pantalla en vivo
+      "dir:img_treecko"   -> directorio de PNGs
+      "rec:grabacion.npz" -> stream grabado
+    """
+    if spec == "mss":
+        return MSSFrameSource()
+    if spec.startswith("dir:"):
+        return DirectoryFrameSource(spec[4:], fps=fps, origin=origin)
+    if spec.startswith("rec:"):
+        return RecordedFrameSource(spec[4:], fps=fps)
+    raise ValueError(f"Fuente de frames desconocida: {spec}")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+grid_layout.py - Cuadrícula de ventanas para N emuladores y regiones del Pokémon derivadas
+Calcula la cuadrícula más densa que cabe en el monitor para N emuladores y, a partir de
+UNA región del Treecko relativa a la ventana (la de coordinate_selector.py sobre una
+captura de un emulador), deriva la región absoluta de cada emulador. Escribe
+coordinates/emulator_coordinates.json completo, sin seleccionar coordenadas a mano.
+
+Uso: python grid_layout.py --count 16 [--monitor 1920x1080] [--roi 74,178,98,84]
+"""
+
+import argparse
+import json
+import math
+import os
+
+CONFIG_PATH = "coordinates/emulator_coordinates.json"
+DEFAULT_MIN_WINDOW = (240, 160)     # ventana más pequeña útil (GBA a 1x)
+DEFAULT_REFERENCE_SIZE = (400, 400)  # tamaño de ventana con el que se tomaron las capturas
+TEMPLATE_WINDOW_SIZE = (400, 400)    # tamaño de ventana con el que se capturaron template/*.png
+
+
+class GridLayout:
+    """
+    Cuadrícula de count ventanas dentro de monitor {"left", "top", "width", "height"}
+    Las ventanas conservan la proporción aspect (ancho/alto) de la ventana de referencia
+    chrome_top: pixels de barra de título + menú, que no se escalan con la ventana
+    """
+
+    def __init__(self, count, monitor, min_window=DEFAULT_MIN_WINDOW, aspect=1.0, spacing=0, chrome_top=0):
+        if count < 1:
+            raise ValueError("Se necesita al menos un emulador")
+        self.count = count
+        self.monitor = monitor
+        self.min_window = min_window
+        self.aspect = aspect
+        self.spacing = spacing
+        self.chrome_top = chrome_top
+        self.cols, self.rows, self.window_width, self.window_height = self.best_grid()
+
+    def best_grid(self):
+        """(columnas, filas, ancho, alto) con las ventanas más grandes posibles"""
+        best = None
+        for cols in range(1, self.count + 1):
+            rows = math.ceil(self.count / cols)
+            width = (self.monitor["width"] - self.spacing * (cols - 1)) / cols
+            height = (self.monitor["height"] - self.spacing * (rows - 1)) / rows
+            width = min(width, height * self.aspect)
+            if best is None or width > best[2]:
+                best = (cols, rows, int(width), int(width / self.aspect))
+
+        cols, rows, width, height = best
+        min_width, min_height = self.min_window
+        if width < min_width or height < min_height:
+            raise ValueError(f"{self.count} emuladores no caben en {self.monitor['width']}x{self.monitor['height']}: "
+                             f"ventanas de {width}x{height} (mínimo {min_width}x{min_height})")
+        return cols, rows, width, height
+
+    def window_region(self, index):
+        """Región absoluta {"top", "left", "width", "height"} de la ventana index"""
+        row, col = divmod(index, self.cols)
+        return {
+            "top": self.monitor["top"] + row * (self.window_height + self.spacing),
+            "left": self.monitor["left"] + col * (self.window_width + self.spacing),
+            "width": self.window_width,
+            "height": self.window_height,
+        }
+
+    def scale_roi(self, roi, reference_size):
+        """ROI relativa a una ventana de reference_size -> ROI relativa a las ventanas de la cuadrícula"""
+        ref_width, ref_height = reference_size
+        sx = self.window_width / ref_width
+        sy = (self.window_height - self.chrome_top) / (ref_height - self.chrome_top)
+        return {
+            "x": round(roi["x"] * sx),
+            "y": round(self.chrome_top + (roi["y"] - self.chrome_top) * sy),
+            "width": max(1, round(roi["width"] * sx)),
+            "height": max(1, round(roi["height"] * sy)),
+        }
+
+    def roi(self, index, reference_roi, reference_size):
+        """Región absoluta del Pokémon en la ventana index"""
+        relative = self.scale_roi(reference_roi, reference_size)
+        window = self.window_region(index)
+        return dict(relative, x=window["left"] + relative["x"], y=window["top"] + relative["y"])
+
+    def to_config(self, reference_roi, reference_size, base=None):
+        """
+        Configuración completa para Comparar_Imagen.py/AbrirEmulador.py
+        base: configuración existente (se conservan el resto de claves y los screenshot_path)
+        """
+        config = dict(base or {})
+        previous = {emu.get("id"): emu for emu in config.get("emulators", [])}
+        emulators = []
+        for index in range(self.count):
+            emulator_id = index + 1
+            window = self.window_region(index)
+            emulator = {
+                "id": emulator_id,
+                "name": f"Emulador_{emulator_id}",
+                "window_region": {"x": window["left"], "y": window["top"],
+                                  "width": window["width"], "height": window["height"]},
+                "pokemon_region": self.roi(index, reference_roi, reference_size),
+            }
+            if "screenshot_path" in previous.get(emulator_id, {}):
+                emulator["screenshot_path"] = previous[emulator_id]["screenshot_path"]
+            emulators.append(emulator)
+
+        config["emulators"] = emulators
+        config["layout"] = {
+            "count": self.count,
+            "cols": self.cols,
+            "rows": self.rows,
+            "left": self.monitor["left"],
+            "top": self.monitor["top"],
+            "window_width": self.window_width,
+            "window_height": self.window_height,
+            "spacing": self.spacing,
+            "chrome_top": self.chrome_top,
+            # Escala de la pantalla GBA respecto a la de los templates (main.py los redimensiona)
+            "template_scale": round(self.window_width / TEMPLATE_WINDOW_SIZE[0], 4),
+            # Para volver a generar con otro número de emuladores
+            "reference_roi": dict(reference_roi),
+            "reference_size": list(reference_size),
+        }
+        config.setdefault("reference_image", "reference/treecko_normal.png")
+        return config
+
+
+def primary_monitor():
+    """Monitor principal {"left", "top", "width", "height"} (con mss)"""
+    import mss
+    with mss.mss() as sct:
+        monitor = sct.monitors[1]
+    return {key: monitor[key] for key in ("left", "top", "width", "height")}
+
+
+def load_config(config_path=CONFIG_PATH):
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def reference_from_config(config):
+    """(ROI relativa a la ventana, tamaño de ventana) guardados, o los del emulador 1 a mano"""
+    layout = config.get("layout")
+    if layout:
+        return layout["reference_roi"], tuple(layout["reference_size"])
+    emulators = config.get("emulators", [])
+    if emulators:
+        # Las configuraciones hechas con coordinate_selector.py son relativas a la captura de la ventana
+        return emulators[0]["pokemon_region"], DEFAULT_REFERENCE_SIZE
+    return None, DEFAULT_REFERENCE_SIZE
+
+
+def template_scale(config):
+    """Escala a la que hay que redimensionar los templates para las ventanas de la cuadrícula"""
+    layout = (config or {}).get("layout")
+    if not layout:
+        return 1.0
+    return layout.get("template_scale") or layout["window_width"] / TEMPLATE_WINDOW_SIZE[0]
+
+
+def save_config(config, config_path=CONFIG_PATH):
+    os.makedirs(os.path.dirname(config_path) or ".", exist_ok=True)
+    with open(config_path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cuadrícula de emuladores y regiones del Pokémon automáticas")
+    parser.add_argument("--count", type=int, required=True, help="número de emuladores")
+    parser.add_argument("--monitor", help="tamaño del área de la cuadrícula, p.ej. 1920x1080 (por defecto el monitor principal)")
+    parser.add_argument("--min-window", default="%dx%d" % DEFAULT_MIN_WINDOW, help="ventana mínima, p.ej. 240x160")
+    parser.add_argument("--spacing", type=int, default=0, help="pixels entre ventanas")
+    parser.add_argument("--chrome-top", type=int, default=0, help="pixels de barra de título + menú de la ventana")
+    parser.add_argument("--roi", help="región del Treecko relativa a la ventana: x,y,ancho,alto")
+    parser.add_argument("--reference-size", help="tamaño de la ventana en la que se midió --roi, p.ej. 400x400")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar la cuadrícula")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    reference_roi, reference_size = reference_from_config(config)
+    if args.roi:
+        x, y, width, height = (int(v) for v in args.roi.split(","))
+        reference_roi = {"x": x, "y": y, "width": width, "height": height}
+    if args.reference_size:
+        reference_size = parse_size(args.reference_size)
+    if reference_roi is None:
+        print("❌ No hay región de referencia: usa --roi x,y,ancho,alto (coordinate_selector.py sobre una captura)")
+        return
+
+    if args.monitor:
+        width, height = parse_size(args.monitor)
+        monitor = {"left": 0, "top": 0, "width": width, "height": height}
+    else:
+        monitor = primary_monitor()
+
+    try:
+        layout = GridLayout(args.count, monitor, parse_size(args.min_window),
+                            aspect=reference_size[0] / reference_size[1],
+                            spacing=args.spacing, chrome_top=args.chrome_top)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    config = layout.to_config(reference_roi, reference_size, base=config)
+    print(f"🧩 {layout.count} emuladores: {layout.cols}x{layout.rows} ventanas de "
+          f"{layout.window_width}x{layout.window_height} en {monitor['width']}x{monitor['height']} "
+          f"(templates a escala {config['layout']['template_scale']:.2f})")
+    for emu in config["emulators"]:
+        region = emu["pokemon_region"]
+        print(f"🎯 {emu['name']}: ({region['x']}, {region['y']}) {region['width']}x{region['height']}")
+
+    if not args.dry_run:
+        save_config(config, args.config)
+        print(f"💾 Configuración guardada en {args.config}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+hunt.py - Caza como máquina de estados declarativa, una por emulador
+Cada EmulatorHunt tiene su región de captura, su estado, sus temporizadores y su canal
+de entrada; un único HuntScheduler los va despertando por turnos. Ningún paso bloquea:
+mientras un emulador espera a que cambie su pantalla, los demás siguen avanzando.
+Las fases, sus acciones, sus sucesores y su presupuesto de tiempo están en build_hunt_table().
+"""
+
+import heapq
+import os
+import time
+
+import cv2
+
+from Comparar_Imagen import SequentialShinyTest, SHINY, UNDECIDED
+from Control import InputScheduler, compile_macro
+
+
+class TransitionWait:
+    """
+    Espera incremental a un cambio de pantalla: poll(screenshot) se llama una vez por captura
+    y devuelve True cuando la espera terminó (ver GameNavigator.wait_for_transition)
+    """
+
+    def __init__(self, navigator, baseline, expected_states=(), timeout=2.0, step=None, min_brightness=None):
+        self.navigator = navigator
+        self.expected_states = tuple(expected_states)
+        self.step = step
+        self.timeout = navigator.timing.timeout(step, timeout) if step is not None else timeout
+        self.min_brightness = min_brightness
+        self.start = time.perf_counter()
+
+        self.baseline_state = navigator.detect_current_screen(baseline) if baseline is not None else navigator.UNKNOWN
+        self.baseline_signature = navigator.frame_signature(baseline) if baseline is not None else None
+        self.state = self.baseline_state
+        self.previous_signature = None
+        self.left_baseline = False    # la pantalla ya cambió alguna vez (aunque vuelva a la misma)
+        self.stable_polls = 0
+        self.done = False
+        self.timed_out = False
+        self.elapsed = None
+
+    def poll(self, screenshot):
+        """Procesa una captura; True si la espera terminó (cambio detectado o timeout)"""
+        if self.done:
+            return True
+        if time.perf_counter() - self.start >= self.timeout:
+            # Un timeout también es una muestra: si el timeout aprendido se queda corto, crece
+            self.timed_out = True
+            return self.finish()
+        if screenshot is None:
+            return False
+
+        navigator = self.navigator
+        self.state = navigator.detect_current_screen(screenshot, expected=self.expected_states)
+        if self.state in self.expected_states and self.state != self.baseline_state:
+            return self.finish()
+
+        signature = navigator.frame_signature(screenshot)
+        if self.baseline_signature is not None and not self.left_baseline:
+            self.left_baseline = navigator.signature_changed(signature, self.baseline_signature)
+        if self.left_baseline:
+            # Esperar a que termine la animación/el texto antes de dar el cambio por hecho
+            if self.previous_signature is not None and not navigator.signature_changed(signature, self.previous_signature):
+                self.stable_polls += 1
+            else:
+                self.stable_polls = 0
+            bright_enough = self.min_brightness is None or float(signature.mean()) > self.min_brightness
+            if self.stable_polls >= navigator.transition_settle_polls and bright_enough:
+                return self.finish()
+        self.previous_signature = signature
+        return False
+
+    def finish(self):
+        self.done = True
+        self.elapsed = time.perf_counter() - self.start
+        if self.step is not None:
+            self.navigator.timing.record(self.step, self.elapsed)
+        return True
+
+
+# Turbo de VBA-M (Space): solo en las fases en las que no hay nada que mirar;
+# se apaga antes del menú de combate y de la comprobación de shiny
+DEFAULT_TURBO_CONFIG = {
+    "enabled": False,
+    "speed": 4.0,         # velocidad aproximada con turbo: escala sondeo, esperas y presupuestos
+    "mode": "hold",       # "hold" = Space pulsado mientras dure, "toggle" = una pulsación enciende/apaga
+    "phases": ["navigate", "select", "to_battle", "reset"],
+    "min_timeout": 0.3,   # ninguna espera escalada baja de aquí
+}
+
+
+class HuntPhase:
+    """
+    Fila de la tabla de la caza:
+      buttons/expected/timeout -> acción que se repite mientras no haya transición
+                                  (buttons puede ser una función que devuelve los pasos)
+      transitions              -> pantalla detectada -> fase siguiente
+      after_action             -> fase a la que se pasa al terminar la acción (None = repetir)
+      budget                   -> segundos máximos en la fase antes de que el watchdog reinicie
+    """
+
+    def __init__(self, name, budget, buttons=None, expected=(), timeout=2.0, timing_step=None,
+                 transitions=None, after_action=None, hold=None, min_brightness=None):
+        self.name = name
+        self.budget = budget
+        self.buttons = buttons
+        self.expected = tuple(expected)
+        self.timeout = timeout
+        self.timing_step = timing_step
+        self.transitions = transitions or {}
+        self.after_action = after_action
+        self.hold = hold
+        self.min_brightness = min_brightness
+
+
+def build_hunt_table(nav, sprt_timeout=3.0):
+    """
+    Tabla declarativa de la caza (antes tres bucles con 50, 30 y 100 intentos)
+    navigate -> select -> to_battle -> battle_menu -> shiny_check -> reset -> navigate
+    (tras un save state se puede seguir directamente en "select")
+    """
+    strategy = nav.reset_strategy
+    if strategy.start_phase not in ("navigate", "select"):
+        raise ValueError(f"Fase inicial inválida tras el reinicio: {strategy.start_phase}")
+    phases = [
+        HuntPhase("navigate", budget=60.0, buttons=["A"], expected=[nav.STARTER_SELECTION], timeout=1.5,
+                  timing_step="press_a_dialog", transitions={nav.STARTER_SELECTION: "select"}),
+        HuntPhase("select", budget=8.0, buttons=["LEFT", 0.3, "A"], expected=[nav.TREECKO_CONFIRMED], timeout=2.8,
+                  timing_step="confirm_starter", after_action="to_battle"),
+        HuntPhase("to_battle", budget=45.0, buttons=["A"], expected=[nav.IN_BATTLE, nav.TREECKO_CONFIRMED],
+                  timeout=1.8, timing_step="press_a_to_battle",
+                  transitions={nav.IN_BATTLE: "battle_menu", nav.TREECKO_BATTLE_MENU: "shiny_check"}),
+        HuntPhase("battle_menu", budget=30.0, buttons=["A"], expected=[nav.TREECKO_BATTLE_MENU], timeout=1.0,
+                  timing_step="press_a_battle_menu", transitions={nav.TREECKO_BATTLE_MENU: "shiny_check"}),
+        # Sin botones: la acción es el SPRT (o el hook de comprobación del modo lockstep)
+        HuntPhase("shiny_check", budget=sprt_timeout + 2.0),
+        # Teclas, espera y fase siguiente según la estrategia de reinicio (ver reset_strategy.py)
+        HuntPhase("reset", budget=strategy.budget, buttons=strategy.macro, hold=strategy.hold,
+                  timeout=strategy.timeout, timing_step=strategy.timing_step,
+                  min_brightness=strategy.min_brightness, after_action=strategy.start_phase),
+    ]
+    return {phase.name: phase for phase in phases}
+
+
+class EmulatorHunt:
+    """
+    Máquina de estados de la caza en un emulador, guiada por la tabla de build_hunt_table()
+    step() hace como mucho una captura y encola teclas; nunca espera
+    El watchdog reinicia en cuanto una fase supera su presupuesto y anota dónde se abortó
+    """
+
+    def __init__(self, emulator_id, navigator, detector, input_backend=None, poll_interval=0.02,
+                 input_scheduler=None, shiny_check=None, reset=None, turbo=None):
+        self.emulator_id = emulator_id
+        self.name = f"Emu {emulator_id + 1}"
+        self.navigator = navigator    # GameNavigator con la región de este emulador
+        self.detector = detector      # detector compartido (pokemon_region de emulator_id)
+        # Canal de entrada propio (o uno compartido, p.ej. el de Control en modo lockstep)
+        self.owns_input = input_scheduler is None
+        self.input = input_scheduler or InputScheduler(input_backend)
+        self.poll_interval = poll_interval
+        self.shiny_check_hook = shiny_check  # callable() -> bool; por defecto SPRT de este emulador
+        self.reset_hook = reset              # callable() que hace el reset completo (bloqueante)
+        self.turbo = dict(DEFAULT_TURBO_CONFIG, **(turbo or {}))
+        self.turbo_on = False
+
+        self.sprt_timeout = detector.sprt_config['timeout'] if detector is not None else 3.0
+        self.table = build_hunt_table(navigator, self.sprt_timeout)
+        self.phase = None
+        self.phase_start = None
+        self.phase_budget = None
+        self.wait = None              # TransitionWait en curso
+        self.after_wait = None        # qué hacer cuando termine la espera
+        self.macro = None             # MacroHandle de las últimas teclas encoladas
+        self.shiny_test = None
+        self.shiny_image = None
+        self.shiny_deadline = None
+        self.shiny_region = None      # región, perfil de referencia y umbral con los que empezó el SPRT
+        self.shiny_profile = None
+        self.shiny_threshold = None
+
+        self.encounters = 0
+        self.resets = 0
+        self.cycles = 0               # reinicios completados
+        self.aborts = {}              # fase -> veces que el watchdog la abortó
+        self.abort_log = []           # (instante, fase, segundos en la fase, pantalla)
+        self.shiny_found = False
+        self.finished = False
+        self.suspended = False        # el supervisor está relanzando este emulador
+        self.pending_rejoin = None    # (región, hwnd) del emulador relanzado, se aplica en step()
+        self.enter("navigate")
+
+    def log(self, message):
+        print(f"[{self.name}] {message}")
+
+    def capture(self):
+        navigator = self.navigator
+        return navigator.capture_full_screen_region(navigator.capture_region)
+
+    def press(self, steps, hold=None, expected=(), timeout=2.0, step=None, min_brightness=None,
+              baseline=None, then=None):
+        """Encola teclas en el canal del emulador y arranca la espera al cambio de pantalla"""
+        if baseline is None:
+            baseline = self.capture()
+        kwargs = {} if hold is None else {"hold": hold}
+        self.macro = self.input.submit(compile_macro(steps, **kwargs))
+        self.wait = TransitionWait(self.navigator, baseline, expected, self.scaled_timeout(timeout),
+                                   self.timing_name(step), min_brightness)
+        self.after_wait = then
+
+    def check_macro(self):
+        """
+        Avisa si las últimas teclas no llegaron al emulador (p.ej. una tecla que el backend
+        no sabe enviar): el planificador guarda el error en el handle sin mostrarlo
+        """
+        handle = self.macro
+        if handle is None or not handle.done.is_set():
+            return
+        self.macro = None
+        if handle.error is not None:
+            self.log(f"⚠️  Las teclas de la fase {self.phase} no llegaron al emulador: {handle.error}")
+
+    def reload_if_changed(self):
+        """Entre ciclos: recarga templates, configuración y referencia si cambiaron en disco"""
+        navigator_reloaded = self.navigator.reload_if_changed()
+        detector_reloaded = self.detector is not None and self.detector.reload_if_changed()
+        # El detector es compartido: otra caza pudo recargarlo antes. El presupuesto de la
+        # comprobación de shiny depende del timeout del SPRT
+        if self.detector is not None and self.detector.sprt_config['timeout'] != self.sprt_timeout:
+            self.sprt_timeout = self.detector.sprt_config['timeout']
+            self.table = build_hunt_table(self.navigator, self.sprt_timeout)
+        return navigator_reloaded or detector_reloaded
+
+    # --- Turbo ---
+
+    def speed(self):
+        """Velocidad actual del emulador (1.0 sin turbo)"""
+        return self.turbo["speed"] if self.turbo_on else 1.0
+
+    def scaled_timeout(self, timeout):
+        """Un timeout pensado a velocidad normal, ajustado a la velocidad actual"""
+        if not self.turbo_on:
+            return timeout
+        return max(timeout / self.turbo["speed"], self.turbo["min_timeout"])
+
+    def timing_name(self, step):
+        """Con turbo los tiempos se miden aparte: no se mezclan con los de velocidad normal"""
+        if step is None or not self.turbo_on:
+            return step
+        return f"{step}_turbo"
+
+    def set_turbo(self, on):
+        """Enciende o apaga el turbo; se encola detrás de las teclas pendientes"""
+        if on == self.turbo_on:
+            return None
+        self.turbo_on = on
+        if self.turbo["mode"] == "toggle":
+            steps = ["TURBO"]
+        else:
+            steps = ["TURBO:DOWN" if on else "TURBO:UP"]
+        return self.input.submit(compile_macro(steps))
+
+    # --- Fases ---
+
+    def enter(self, name):
+        """Pasa a la fase name; el presupuesto sale de lo medido (sin pasar del de la tabla)"""
+        now = time.perf_counter()
+        timing = self.navigator.timing
+        self.check_macro()
+        if self.phase is not None and self.phase_start is not None:
+            timing.record(self.timing_name(f"phase_{self.phase}"), now - self.phase_start)
+        if self.phase == "reset" and name != "reset":
+            self.cycles += 1
+            timing.save()
+            self.reload_if_changed()
+
+        self.set_turbo(self.turbo["enabled"] and name in self.turbo["phases"])
+        phase = self.table[name]
+        self.phase = name
+        self.phase_start = now
+        self.phase_budget = timing.timeout(self.timing_name(f"phase_{name}"), phase.budget / self.speed(),
+                                           floor=2 * self.scaled_timeout(phase.timeout))
+        self.wait = None
+        self.after_wait = None
+        if name == "shiny_check":
+            self.start_shiny_check()
+        elif name == "reset":
+            self.resets += 1
+            self.log(f"🔄 Reinicio #{self.resets}")
+
+    def watchdog(self, now):
+        """True si la fase actual superó su presupuesto: se anota y se reinicia"""
+        elapsed = now - self.phase_start
+        if elapsed <= self.phase_budget:
+            return False
+
+        nav = self.navigator
+        screen = nav.state_names.get(nav.last_known_state, "UNKNOWN")
+        self.aborts[self.phase] = self.aborts.get(self.phase, 0) + 1
+        self.abort_log.append((time.time(), self.phase, elapsed, screen))
+        self.log(f"⏰ Watchdog: '{self.phase}' superó su presupuesto "
+                 f"({elapsed:.1f} s > {self.phase_budget:.1f} s) en pantalla {screen} → reinicio")
+        # El tiempo perdido no cuenta como muestra de la fase
+        self.phase_start = None
+        self.enter("reset")
+        return True
+
+    def step(self, now):
+        """Avanza la máquina de estados; retorna el instante en que quiere volver a ejecutarse"""
+        if self.pending_rejoin is not None:
+            self.apply_rejoin()
+        if self.suspended:
+            return now + 0.5
+
+        # Con turbo la pantalla cambia antes: se sondea más a menudo
+        poll_interval = self.poll_interval / self.speed()
+        if self.watchdog(now):
+            return now + poll_interval
+
+        screenshot = self.capture()
+        if self.wait is not None:
+            if not self.wait.poll(screenshot):
+                return now + poll_interval
+            state = self.wait.state
+            self.wait = None
+            self.check_macro()
+            then, self.after_wait = self.after_wait, None
+            if then is not None:
+                then(state)
+                return now + poll_interval
+        else:
+            state = self.navigator.detect_current_screen(screenshot)
+
+        self.run_phase(state, screenshot)
+        return now + poll_interval
+
+    def run_phase(self, state, screenshot):
+        """Transición según la pantalla detectada o, si no hay, la acción de la fase"""
+        phase = self.table[self.phase]
+        next_phase = phase.transitions.get(state)
+        if next_phase is not None:
+            self.enter(next_phase)
+            return
+
+        if phase.name == "shiny_check":
+            self.on_shiny_check()
+            return
+        if phase.name == "reset":
+            self.navigator.last_known_state = self.navigator.UNKNOWN  # tras el reset se vuelve al título
+            if self.reset_hook is not None:
+                self.reset_hook()
+                self.enter(phase.after_action)
+                return
+
+        then = (lambda _: self.enter(phase.after_action)) if phase.after_action else None
+        buttons = phase.buttons() if callable(phase.buttons) else phase.buttons
+        self.press(buttons, hold=phase.hold, expected=phase.expected, timeout=phase.timeout,
+                   step=phase.timing_step, min_brightness=phase.min_brightness, baseline=screenshot, then=then)
+
+    # --- Supervisor (ver supervisor.py) ---
+
+    def suspend(self):
+        """Deja de avanzar mientras se relanza el emulador (se llama desde el hilo del supervisor)"""
+        self.suspended = True
+
+    def rejoin(self, region=None, hwnd=None):
+        """Pide volver a la caza con el emulador relanzado; se aplica en el siguiente step()"""
+        self.pending_rejoin = (region, hwnd)
+
+    def apply_rejoin(self):
+        """Reengancha la caza al emulador nuevo: región, ventana y estado desde cero"""
+        region, hwnd = self.pending_rejoin
+        self.pending_rejoin = None
+        if region is not None:
+            self.navigator.capture_region = region
+        if hwnd is not None and hasattr(self.input.backend, "hwnd"):
+            self.input.backend.hwnd = hwnd
+        # El emulador nuevo no tiene nada pulsado (ni turbo)
+        self.input.release_all()
+        self.turbo_on = False
+        self.navigator.last_known_state = self.navigator.UNKNOWN
+        self.phase_start = None  # el tiempo caído no cuenta como muestra de la fase
+        self.suspended = False
+        self.log("🔁 Emulador relanzado: vuelve a la caza")
+        # El reinicio deja el juego recién arrancado igual que tras un intento (carga el save state si toca)
+        self.enter("reset")
+
+    # --- Comprobación de shiny ---
+
+    def start_shiny_check(self):
+        detector = self.detector
+        config = detector.sprt_config
+        params = {key: config[key] for key in ("alpha", "beta", "mu_normal", "mu_shiny", "sigma", "llr_clip")}
+        self.shiny_test = SequentialShinyTest(**params)
+        self.shiny_image = None
+        self.shiny_deadline = time.perf_counter() + config['timeout']
+        # El detector es compartido y otra caza puede recargarlo a mitad de este SPRT:
+        # la prueba entera usa la región, la referencia y el umbral con los que empezó
+        regions = detector.capture_regions
+        self.shiny_region = regions[self.emulator_id] if self.emulator_id < len(regions) else None
+        self.shiny_profile = detector.get_reference_profile()
+        self.shiny_threshold = detector.similarity_threshold
+
+    def on_shiny_check(self):
+        """Un frame por paso al SPRT de este emulador (o el hook bloqueante del modo lockstep)"""
+        if self.shiny_check_hook is not None:
+            self.encounters += 1
+            if self.shiny_check_hook():
+                self.shiny_found = True
+                self.finished = True
+            else:
+                self.enter("reset")
+            return
+
+        image = None
+        if self.shiny_region is not None:
+            image = self.detector.capture_region_from_emulator(self.emulator_id, self.navigator.get_frame_source(),
+                                                               region=self.shiny_region)
+        if image is not None:
+            score = self.detector.score_image(image, self.shiny_profile)
+            if score is not None:
+                self.shiny_test.update(score)
+                self.shiny_image = image
+
+        test = self.shiny_test
+        if test.decision == UNDECIDED and time.perf_counter() < self.shiny_deadline:
+            return
+
+        self.encounters += 1
+        similarity = test.mean_score()
+        # Sin decisión al vencer el timeout: ante la duda se usa el umbral de similitud
+        is_shiny = test.decision == SHINY or (test.decision == UNDECIDED and similarity is not None
+                                              and similarity < self.shiny_threshold)
+        if similarity is None:
+            self.log(f"🧮 SPRT: {test.decision} sin capturas válidas")
+        else:
+            self.log(f"🧮 SPRT: {test.decision} tras {test.frames} frames - similitud {similarity:.3f}")
+
+        if is_shiny:
+            self.found_shiny()
+        else:
+            self.enter("reset")
+
+    def found_shiny(self):
+        self.log(f"🌟🌟🌟 ¡SHINY ENCONTRADO! ({self.encounters} encuentros, {self.resets} reinicios) 🌟🌟🌟")
+        if self.shiny_image is not None:
+            filename = f"screenshots/SHINY_MAIN_Emulator{self.emulator_id + 1}_{int(time.time())}.png"
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            cv2.imwrite(filename, self.shiny_image)
+            self.log(f"💾 Screenshot del shiny guardado: {filename}")
+        self.shiny_found = True
+        self.finished = True
+
+    def close(self):
+        """Para la caza: descarta sus teclas pendientes, suelta las pulsadas y apaga el turbo"""
+        self.finished = True
+        if self.owns_input:
+            self.input.cancel()
+        if self.turbo_on:
+            self.set_turbo(False).wait(1.0)  # no dejar el emulador acelerado
+        if self.owns_input:
+            self.input.close()
+
+
+def abort_summary(hunts):
+    """Líneas 'fase: abortos' sumando todas las cazas (dónde pierden tiempo los ciclos)"""
+    totals = {}
+    for hunt in hunts:
+        for phase, count in hunt.aborts.items():
+            totals[phase] = totals.get(phase, 0) + count
+    return [f"{phase}: {count} abortos por presupuesto" for phase, count in sorted(totals.items())]
+
+
+class HuntScheduler:
+    """
+    Planificador compartido: ejecuta el step() de cada caza cuando le toca (cola por instante)
+    Un único hilo, así que las capturas y la detección no necesitan locks
+    """
+
+    def __init__(self, hunts, stop_on_shiny=True):
+        self.hunts = hunts
+        self.stop_on_shiny = stop_on_shiny
+        self.running = False
+        self.disable_shared_turbo()
+
+    def disable_shared_turbo(self):
+        """
+        El turbo es una tecla del backend: si varias cazas comparten backend (pyautogui/pynput
+        escriben en la ventana con foco) el Space de una aceleraría o frenaría a las demás,
+        incluso en plena comprobación de shiny. Solo se permite con un canal por emulador
+        """
+        users = {}
+        for hunt in self.hunts:
+            users.setdefault(id(hunt.input.backend), []).append(hunt)
+        for shared in users.values():
+            if len(shared) < 2:
+                continue
+            for hunt in shared:
+                if hunt.turbo["enabled"]:
+                    hunt.log("⚠️  Turbo desactivado: el backend de entrada es compartido con otras cazas")
+                    hunt.turbo = dict(hunt.turbo, enabled=False)
+                    hunt.set_turbo(False)
+
+    def run(self, duration=None, until=None):
+        """Ejecuta las cazas hasta encontrar un shiny, hasta duration segundos o hasta que until() sea True"""
+        self.running = True
+        start = time.perf_counter()
+        queue = [(start, i) for i in range(len(self.hunts))]
+        heapq.heapify(queue)
+
+        try:
+            while self.running and queue:
+                due, index = heapq.heappop(queue)
+                now = time.perf_counter()
+                if duration is not None and now - start >= duration:
+                    break
+                if due > now:
+                    time.sleep(due - now)
+                    now = due
+
+                hunt = self.hunts[index]
+                try:
+                    next_due = hunt.step(now)
+                except Exception as e:
+                    hunt.log(f"❌ Error: {e}")
+                    next_due = now + 1.0
+
+                if hunt.shiny_found and self.stop_on_shiny:
+                    break
+                if until is not None and until():
+                    break
+                if not hunt.finished:
+                    heapq.heappush(queue, (next_due, index))
+        finally:
+            self.running = False
+
+        return [hunt for hunt in self.hunts if hunt.shiny_found]
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        """Para todas las cazas (p.ej. tras un shiny las demás no siguen a medio ciclo)"""
+        self.stop()
+        for hunt in self.hunts:
+            hunt.close()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+input_backend.py - Backends intercambiables para enviar teclas al emulador
+Backends: pyautogui (sin PAUSE), pynput, PostMessage a una ventana concreta (Windows)
+y uno falso que solo graba los eventos (para pruebas)
+
+Cada backend mide cuánto tarda en despachar cada evento (keyDown/keyUp).
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class InputBackend:
+    """Interfaz común: key_down(key) / key_up(key) con estadísticas de latencia por evento"""
+
+    name = "base"
+
+    def __init__(self, history=1000):
+        self.latencies = deque(maxlen=history)  # segundos por evento despachado
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def key_down(self, key):
+        start = time.perf_counter()
+        self._key_down(key)
+        self._record(time.perf_counter() - start)
+
+    def key_up(self, key):
+        start = time.perf_counter()
+        self._key_up(key)
+        self._record(time.perf_counter() - start)
+
+    def _key_down(self, key):
+        raise NotImplementedError
+
+    def _key_up(self, key):
+        raise NotImplementedError
+
+    def _record(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.events += 1
+
+    def latency_stats(self):
+        """{"events", "mean_ms", "p50_ms", "p99_ms", "max_ms"} de los últimos eventos"""
+        with self._lock:
+            values = np.array(self.latencies) * 1000
+            events = self.events
+        if len(values) == 0:
+            return {"events": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p50, p99 = np.percentile(values, [50, 99])
+        return {"events": events, "mean_ms": float(values.mean()), "p50_ms": float(p50),
+                "p99_ms": float(p99), "max_ms": float(values.max())}
+
+    def close(self):
+        """Libera los recursos del backend"""
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    """pyautogui sin la pausa automática (PAUSE) que añade tras cada llamada"""
+
+    name = "pyautogui"
+
+    def __init__(self, history=1000):
+        super().__init__(history)
+        import pyautogui
+        pyautogui.PAUSE = 0
+        self.pyautogui = pyautogui
+
+    def _key_down(self, key):
+        self.pyautogui.keyDown(key)
+
+    def _key_up(self, key):
+        self.pyautogui.keyUp(key)
+
+
+class PynputBackend(InputBackend):
+    """pynput: envía los eventos directamente al sistema, sin el camino genérico de pyautogui"""
+
+    name = "pynput"
+
+    # Teclas con nombre -> miembro de pynput.keyboard.Key (las de un carácter se envían tal cual)
+    NAMED_KEYS = ("space", "shift", "enter", "backspace", "f1", "f2", "f3", "f4")
+
+    def __init__(self, history=1000):
+        super().__init__(history)
+        from pynput.keyboard import Controller, Key
+        self.keyboard = Controller()
+        self.named_keys = {name: getattr(Key, name) for name in self.NAMED_KEYS}
+
+    def pynput_key(self, key):
+        named = self.named_keys.get(key.lower())
+        if named is not None:
+            return named
+        if len(key) != 1:
+            raise ValueError(f"Tecla sin equivalente en pynput: {key}")
+        return key
+
+    def _key_down(self, key):
+        self.keyboard.press(self.pynput_key(key))
+
+    def _key_up(self, key):
+        self.keyboard.release(self.pynput_key(key))
+
+
+class PostMessageBackend(InputBackend):
+    """
+    Envía WM_KEYDOWN/WM_KEYUP a la ventana hwnd sin necesitar el foco:
+    cada emulador tiene su propio canal de entrada
+    """
+
+    name = "postmessage"
+
+    # Teclas con nombre -> código virtual (las letras/dígitos usan su mayúscula)
+    VIRTUAL_KEYS = {"space": 0x20, "shift": 0x10, "enter": 0x0D, "backspace": 0x08,
+                    "f1": 0x70, "f2": 0x71, "f3": 0x72, "f4": 0x73}
+
+    def __init__(self, hwnd, history=1000):
+        super().__init__(history)
+        import win32api
+        import win32con
+        self.win32api = win32api
+        self.win32con = win32con
+        self.hwnd = hwnd
+
+    def virtual_key(self, key):
+        return self.VIRTUAL_KEYS.get(key.lower(), ord(key.upper()))
+
+    def _lparam(self, vk, key_up):
+        scan_code = self.win32api.MapVirtualKey(vk, 0)
+        lparam = 1 | (scan_code << 16)
+        if key_up:
+            lparam |= 0xC0000000  # estado previo pulsada + transición a soltada
+        return lparam
+
+    def _key_down(self, key):
+        vk = self.virtual_key(key)
+        self.win32api.PostMessage(self.hwnd, self.win32con.WM_KEYDOWN, vk, self._lparam(vk, False))
+
+    def _key_up(self, key):
+        vk = self.virtual_key(key)
+        self.win32api.PostMessage(self.hwnd, self.win32con.WM_KEYUP, vk, self._lparam(vk, True))
+
+
+class RecordingBackend(InputBackend):
+    """Backend falso: no pulsa nada, guarda (instante, "down"/"up", tecla) de cada evento"""
+
+    name = "fake"
+
+    def __init__(self, history=1000):
+        super().__init__(history)
+        self.recorded = []
+
+    def _key_down(self, key):
+        self.recorded.append((time.perf_counter(), "down", key))
+
+    def _key_up(self, key):
+        self.recorded.append((time.perf_counter(), "up", key))
+
+
+INPUT_BACKENDS = {
+    "pyautogui": PyAutoGUIBackend,
+    "pynput": PynputBackend,
+    "postmessage": PostMessageBackend,
+    "fake": RecordingBackend,
+}
+
+
+def create_input_backend(spec="pyautogui", **kwargs):
+    """
+    Crea un backend por nombre: "pyautogui", "pynput", "postmessage" (necesita hwnd=) o "fake"
+    """
+    backend_class = INPUT_BACKENDS.get(spec)
+    if backend_class is None:
+        raise ValueError(f"Backend de entrada desconocido: {spec}")
+    return backend_class(**kwargs)
@@ -5,55 +5,175 @@ Maneja: apertura de emuladores, navegación automática y detección de shinies
 """
 
 from Control import *
-from AbrirEmulador import verificar_archivos, abrir_emuladores, cerrar_emuladores
-from Comparar_Imagen import MultiEmulatorShinyDetector
+from input_backend import create_input_backend
+from AbrirEmulador import verificar_archivos, abrir_emuladores, cerrar_emuladores, emulator_region, emulator_windows, NUM_EMULATORS
+from Comparar_Imagen import MultiEmulatorShinyDetector, SHINY, UNDECIDED
+from frame_source import MSSFrameSource
+from screen_hash import ScreenHashIndex
+from fft_matcher import FFTTemplateBank
+from asset_bundle import load_bundle, read_config, scale_image, spectrum_variant, CONFIG_PATH
+from grid_layout import template_scale
+from timing_profile import get_timing_profile
+from file_watcher import FileWatcher
+from reset_strategy import SoftResetStrategy, create_reset_strategy
+from supervisor import EmulatorSupervisor, DEFAULT_SUPERVISOR_CONFIG
+from hunt import TransitionWait, EmulatorHunt, HuntScheduler, abort_summary
 import time
 import cv2
 import numpy as np
-import mss
 import os
 import sys
 
+# Modos de template matching en el frame completo
+MATCH_MODES = ("full", "pyramid", "fft")
+
 class GameNavigator:
-    def __init__(self):
-        """Navegador del juego integrado en main.py"""
+    def __init__(self, frame_source=None, capture_region=None):
+        """
+        Navegador del juego integrado en main.py
+        frame_source: fuente de frames (ver frame_source.py); por defecto captura en vivo con mss
+        capture_region: región de pantalla a vigilar (por defecto la región clásica de 800x600)
+        """
         # Estados del juego (DEFINIR PRIMERO antes que todo)
         self.UNKNOWN = 0
         self.STARTER_SELECTION = 1    # Pantalla de Birch (imagen 2)
         self.TREECKO_CONFIRMED = 2    # Treecko seleccionado (imagen 3)
         self.IN_BATTLE = 3            # En combate (pantalla inicial)
         self.TREECKO_BATTLE_MENU = 4  # Menú de combate con Treecko visible
+        self.state_names = {
+            self.UNKNOWN: "UNKNOWN",
+            self.STARTER_SELECTION: "STARTER_SELECTION",
+            self.TREECKO_CONFIRMED: "TREECKO_CONFIRMED",
+            self.IN_BATTLE: "IN_BATTLE",
+            self.TREECKO_BATTLE_MENU: "TREECKO_BATTLE_MENU"
+        }
+        
+        # Grafo de transiciones: estado -> sucesores probables (incluye quedarse en el mismo)
+        # Los templates se prueban en ese orden; los que no son sucesores quedan al final
+        self.transitions = {
+            self.UNKNOWN: [self.STARTER_SELECTION, self.TREECKO_CONFIRMED, self.IN_BATTLE, self.TREECKO_BATTLE_MENU],
+            self.STARTER_SELECTION: [self.STARTER_SELECTION, self.TREECKO_CONFIRMED, self.IN_BATTLE],
+            self.TREECKO_CONFIRMED: [self.TREECKO_CONFIRMED, self.IN_BATTLE, self.TREECKO_BATTLE_MENU],
+            self.IN_BATTLE: [self.IN_BATTLE, self.TREECKO_BATTLE_MENU],
+            self.TREECKO_BATTLE_MENU: [self.TREECKO_BATTLE_MENU, self.STARTER_SELECTION]
+        }
+        self.last_known_state = self.UNKNOWN
+        self.transition_stats = {}      # (desde, template probado) -> {"hits", "misses"}
+        self.early_exit_confidence = 0.9  # confianza a partir de la cual no se prueban más templates
+        
+        # Región de captura - ajustar según tu configuración de emulador principal
+        self.capture_region = capture_region or {"top": 50, "left": 50, "width": 800, "height": 600}
+        
+        # Template matching
+        self.match_threshold = 0.7
+        self.search_padding = 16      # pixels extra alrededor de la ventana de búsqueda
+        self.template_windows = {}    # estado -> ventana aprendida {"x", "y", "width", "height"}
+        self.template_patches = {}    # estado -> (zona declarada de la pantalla GBA, recorte del template)
+        self.screen_origin = None     # (x, y) de la pantalla GBA en la región de captura
+        self.template_scale = None    # tamaño de la ventana del emulador / el de las capturas de template/
+        
+        # Modo pirámide: match grueso en escala de grises reducida y refinado a resolución completa
+        self.match_mode = "full"
+        self.pyramid_scale = 0.25
+        self.coarse_threshold = 0.6
+        self.coarse_templates = {}    # estado -> template gris reducido
+        self._coarse_frame_cache = (None, None)
+        
+        # Modo FFT: todos los templates correlacionados contra una sola DFT del frame
+        self.fft_bank = None
+        self._fft_frame_cache = (None, None)
+        
+        # Índice de huellas perceptuales (dHash): clasifica el frame sin template matching
+        # cuando la huella es inequívoca; se alimenta de los templates y de frames ya detectados
+        self.use_screen_hash = True
+        self.screen_index = ScreenHashIndex()
+        self.last_match_confidence = 0.0  # confianza del último match_templates (0.0 si UNKNOWN)
+        self.unknown_fingerprint_ttl = 10.0  # segundos sin usarse tras los que caduca una huella UNKNOWN
+        
+        # Espera por eventos: tras pulsar un botón se sondea la pantalla hasta que cambia
+        self.transition_poll_interval = 0.02  # segundos entre capturas
+        self.transition_change_threshold = 4.0  # diferencia media (0-255) para considerar que cambió
+        self.transition_settle_polls = 2      # capturas iguales seguidas para dar la pantalla por estable
+        self.last_transition_time = None      # duración de la última espera (None = timeout)
+        
+        # Cómo se vuelve al principio de cada intento: soft reset o save state (ver reset_strategy.py)
+        self.reset_strategy = SoftResetStrategy()
+        
+        # Turbo del emulador en las fases sin nada que mirar (ver DEFAULT_TURBO_CONFIG en hunt.py)
+        self.turbo_config = {}
+        
+        # Tiempos medidos de cada paso, compartidos por todos los navegadores y cazas
+        # (persisten en coordinates/timing_profile.json; los guarda la caza al final de cada ciclo)
+        self.timing = get_timing_profile()
         
         # Inicializar otras variables
-        self.sct = mss.mss()
+        self.frame_source = frame_source
         self.shiny_detector = None
         self.encounters = 0
         self.resets = 0  # ← CONTADOR DE REINICIOS
         self.start_time = time.time()
         self.shiny_found = False  # ← BANDERA PARA SHINY ENCONTRADO
+        self.hunt = None          # máquina de estados del modo lockstep (se crea en el primer ciclo)
         
         # Cargar templates DESPUÉS de definir constantes
         self.templates = self.load_templates()
+        self.template_watcher = FileWatcher(self.template_files())  # recarga en caliente (reload_if_changed)
         
     def clear_screen(self):
         """Limpia la pantalla de la terminal"""
         os.system('cls' if os.name == 'nt' else 'clear')
         
+    def template_files(self):
+        """
+        Archivo -> (estado, zona característica de la pantalla relativa a la pantalla GBA)
+        Los templates son la pantalla GBA entera; en cuanto se conoce dónde está la pantalla
+        en la región de captura (primer match en frame completo de cualquier template) cada
+        template se busca solo en su zona. Zona None = se aprende la ventana del template
+        entero en su primer match en frame completo
+        """
+        return {
+            # Placa con el nombre del inicial señalado (Torchic) / de Treecko a la izquierda
+            "template/starter_selection.png": (self.STARTER_SELECTION, {"x": 205, "y": 120, "width": 174, "height": 58}),
+            "template/treecko_confirmed.png": (self.TREECKO_CONFIRMED, {"x": 0, "y": 110, "width": 176, "height": 58}),
+            # Caja de texto "Wild POOCHYENA appeared!" / menú FIGHT-BAG de la esquina inferior derecha
+            "template/in_battle.png": (self.IN_BATTLE, {"x": 4, "y": 180, "width": 372, "height": 74}),
+            "template/treecko_battle_menu.png": (self.TREECKO_BATTLE_MENU, {"x": 216, "y": 178, "width": 164, "height": 76})  # ← NUEVA PANTALLA
+        }
+    
     def load_templates(self):
-        """Carga imágenes template para detectar pantallas"""
+        """
+        Carga imágenes template para detectar pantallas
+        Las versiones decodificadas, reducidas y los espectros FFT salen del bundle de
+        assets (mmap, ver asset_bundle.py); solo lo que no esté en él se calcula aquí
+        """
+        if self.template_scale is None:
+            # Hasta que apply_config diga otra cosa, la de la cuadrícula de la configuración en disco
+            self.template_scale = template_scale(read_config(CONFIG_PATH))
+        frame_shape = (self.capture_region['height'], self.capture_region['width'])
+        bundle = load_bundle(pyramid_scale=self.pyramid_scale, frame_shape=frame_shape,
+                             templates_scale=self.template_scale)
         templates = {}
-        template_files = {
-            "template/starter_selection.png": self.STARTER_SELECTION,
-            "template/treecko_confirmed.png": self.TREECKO_CONFIRMED,
-            "template/in_battle.png": self.IN_BATTLE,
-            "template/treecko_battle_menu.png": self.TREECKO_BATTLE_MENU  # ← NUEVA PANTALLA
-        }
-        
-        for file_path, state in template_files.items():
+        spectra = {}
+        for file_path, (state, patch) in self.template_files().items():
             if os.path.exists(file_path):
-                template = cv2.imread(file_path)
+                template = bundle.get(file_path, "bgr")
+                if template is None:
+                    template = cv2.imread(file_path)
+                    if template is not None:
+                        template = scale_image(template, self.template_scale)
                 if template is not None:
                     templates[state] = template
+                    coarse = bundle.get(file_path, "coarse")
+                    self.coarse_templates[state] = coarse if coarse is not None else self.to_coarse(template)
+                    gray = bundle.get(file_path, "gray")
+                    self.screen_index.add_image(state, gray if gray is not None else template)
+                    spectrum = bundle.get(file_path, spectrum_variant(frame_shape))
+                    if spectrum is not None:
+                        spectra[state] = spectrum
+                    if patch is not None:
+                        patch = {key: round(value * self.template_scale) for key, value in patch.items()}
+                        crop = template[patch['y']:patch['y'] + patch['height'], patch['x']:patch['x'] + patch['width']]
+                        self.template_patches[state] = (patch, crop)
                     print(f"✅ Template cargado: {file_path}")
                 else:
                     print(f"⚠️  Error cargando template: {file_path}")
@@ -62,98 +182,377 @@ class GameNavigator:
         
         if not templates:
             print("⚠️  No se cargaron templates - navegación será básica")
+        else:
+            # Espectros de los templates para el tamaño de la región de captura
+            self.fft_bank = FFTTemplateBank(templates, frame_shape, spectra=spectra)
         
         return templates
     
+    def reload_if_changed(self):
+        """
+        Si algún template cambió en disco, recarga templates, huellas y espectros FFT;
+        si la carga falla se mantienen los anteriores. Pensado para llamarse entre ciclos
+        """
+        changed = self.template_watcher.poll()
+        if not changed:
+            return False
+        
+        print(f"🔄 Cambios en {', '.join(changed)}: recargando templates...")
+        return self.reload_templates()
+    
+    def reload_templates(self):
+        """Vuelve a cargar los templates; si la carga falla se mantienen los anteriores"""
+        previous = (self.coarse_templates, self.screen_index, self.template_windows, self.template_patches, self.fft_bank)
+        # Todo lo derivado de los templates (incluidas ventanas y huellas aprendidas) empieza de cero;
+        # la posición de la pantalla GBA no depende de los templates y se conserva
+        self.coarse_templates, self.screen_index, self.template_windows, self.template_patches = {}, ScreenHashIndex(), {}, {}
+        templates = self.load_templates()
+        if not templates:
+            self.coarse_templates, self.screen_index, self.template_windows, self.template_patches, self.fft_bank = previous
+            print("⚠️  Recarga cancelada: se mantienen los templates anteriores")
+            return False
+        
+        self.templates = templates
+        self._coarse_frame_cache = (None, None)
+        self._fft_frame_cache = (None, None)
+        return True
+    
+    def get_frame_source(self):
+        """Devuelve la fuente de frames del navegador (crea una de mss si no hay ninguna)"""
+        if self.frame_source is None:
+            self.frame_source = MSSFrameSource()
+        return self.frame_source
+    
     def capture_full_screen_region(self, region_coords):
         """Captura una región específica de la pantalla"""
         try:
-            screenshot = self.sct.grab(region_coords)
-            img = np.array(screenshot)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            return img
+            return self.get_frame_source().grab_bgr(region_coords)
         except Exception as e:
             print(f"Error capturando pantalla: {e}")
             return None
     
-    def detect_current_screen(self, screenshot):
-        """Detecta en qué pantalla estamos usando template matching"""
-        if screenshot is None or not self.templates:
-            return self.UNKNOWN
-        
-        best_match = self.UNKNOWN
-        best_confidence = 0.0
-        
-        for state, template in self.templates.items():
+    def apply_config(self, config):
+        """Ajustes de detección de pantallas de la configuración (iguales para todos los navegadores)"""
+        self.set_match_mode(config.get('match_mode', 'full'))
+        self.use_screen_hash = config.get('screen_hash', True)
+        # Ventanas de la cuadrícula (grid_layout.py) más chicas o grandes que las de las capturas:
+        # templates, recortes y huellas se redimensionan a su tamaño
+        scale = template_scale(config)
+        if scale != self.template_scale:
+            previous_scale, self.template_scale = self.template_scale, scale
+            print(f"📐 Templates a escala {scale:.2f} (ventanas de la cuadrícula)")
+            if self.reload_templates():
+                self.screen_origin = None  # la pantalla GBA tiene otro tamaño: se vuelve a buscar
+            else:
+                self.template_scale = previous_scale
+    
+    def set_match_mode(self, mode):
+        """Cambia el modo de matching en frame completo ("full", "pyramid" o "fft")"""
+        if mode not in MATCH_MODES:
+            print(f"⚠️  Modo de matching desconocido '{mode}', usando 'full'")
+            mode = "full"
+        self.match_mode = mode
+    
+    def to_coarse(self, image):
+        """Copia en escala de grises reducida (nivel grueso de la pirámide)"""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, None, fx=self.pyramid_scale, fy=self.pyramid_scale, interpolation=cv2.INTER_AREA)
+    
+    def get_coarse_frame(self, screenshot):
+        """Nivel grueso del frame, calculado una sola vez por frame"""
+        cached_frame, coarse = self._coarse_frame_cache
+        if cached_frame is not screenshot:
+            coarse = self.to_coarse(screenshot)
+            self._coarse_frame_cache = (screenshot, coarse)
+        return coarse
+    
+    def get_fft_matches(self, screenshot):
+        """Resultados de todos los templates en una pasada FFT, calculados una sola vez por frame"""
+        cached_frame, matches = self._fft_frame_cache
+        if cached_frame is not screenshot:
+            matches = self.fft_bank.match_all(screenshot)
+            self._fft_frame_cache = (screenshot, matches)
+        return matches
+    
+    def set_search_window(self, state, window):
+        """Fija la ventana de búsqueda {"x", "y", "width", "height"} de un template"""
+        self.template_windows[state] = window
+    
+    def clear_search_windows(self):
+        """Olvida la posición de la pantalla GBA y las ventanas aprendidas (fuerza el frame completo)"""
+        self.screen_origin = None
+        self.template_windows.clear()
+    
+    def has_search_window(self, state):
+        """True si el template se puede buscar en una ventana pequeña"""
+        return state in self.template_windows or (state in self.template_patches and self.screen_origin is not None)
+    
+    def match_template_in_window(self, screenshot, state):
+        """
+        Busca un template solo dentro de su ventana esperada (con padding): su zona declarada
+        si se conoce la posición de la pantalla GBA y, si no, la ventana aprendida
+        Retorna (confianza, (x, y) del template entero) o (0.0, None) si no tiene ventana o no cabe
+        """
+        if state in self.template_patches and self.screen_origin is not None:
+            patch, crop = self.template_patches[state]
+            window = {"x": self.screen_origin[0] + patch['x'], "y": self.screen_origin[1] + patch['y'],
+                      "width": patch['width'], "height": patch['height']}
+            max_val, max_loc = self.match_template_around(screenshot, state, window, self.search_padding, crop)
+            if max_loc is not None:
+                max_loc = (max_loc[0] - patch['x'], max_loc[1] - patch['y'])
+            return max_val, max_loc
+        
+        window = self.template_windows.get(state)
+        if window is None:
+            return 0.0, None
+        return self.match_template_around(screenshot, state, window, self.search_padding)
+    
+    def match_template_around(self, screenshot, state, window, pad, template=None):
+        """Busca un template (o un recorte suyo) a resolución completa dentro de una ventana más un margen"""
+        if template is None:
+            template = self.templates[state]
+        x0 = max(0, window['x'] - pad)
+        y0 = max(0, window['y'] - pad)
+        x1 = min(screenshot.shape[1], window['x'] + window['width'] + pad)
+        y1 = min(screenshot.shape[0], window['y'] + window['height'] + pad)
+        
+        if x1 - x0 < template.shape[1] or y1 - y0 < template.shape[0]:
+            return 0.0, None
+        
+        result = cv2.matchTemplate(screenshot[y0:y1, x0:x1], template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, (x0 + max_loc[0], y0 + max_loc[1])
+    
+    def match_template_pyramid(self, screenshot, state):
+        """
+        Coarse-to-fine: match en el nivel gris reducido y, solo si supera coarse_threshold,
+        refinado a resolución completa alrededor del mejor pico grueso
+        """
+        coarse_frame = self.get_coarse_frame(screenshot)
+        coarse_template = self.coarse_templates[state]
+        if coarse_template.shape[0] > coarse_frame.shape[0] or coarse_template.shape[1] > coarse_frame.shape[1]:
+            return 0.0, None
+        
+        result = cv2.matchTemplate(coarse_frame, coarse_template, cv2.TM_CCOEFF_NORMED)
+        _, coarse_val, _, coarse_loc = cv2.minMaxLoc(result)
+        if coarse_val < self.coarse_threshold:
+            return 0.0, None
+        
+        # Un pixel grueso equivale a 1/scale pixels completos: refinar con ese margen
+        template = self.templates[state]
+        window = {"x": int(coarse_loc[0] / self.pyramid_scale), "y": int(coarse_loc[1] / self.pyramid_scale),
+                  "width": template.shape[1], "height": template.shape[0]}
+        margin = int(np.ceil(1.0 / self.pyramid_scale)) + 1
+        return self.match_template_around(screenshot, state, window, margin)
+    
+    def match_template_full_frame(self, screenshot, state):
+        """
+        Busca un template en todo el frame; si lo encuentra, aprende su ventana y la
+        posición de la pantalla GBA (los templates son la pantalla entera)
+        """
+        template = self.templates[state]
+        if template.shape[0] > screenshot.shape[0] or template.shape[1] > screenshot.shape[1]:
+            return 0.0, None
+        
+        if self.match_mode == "pyramid":
+            max_val, max_loc = self.match_template_pyramid(screenshot, state)
+        elif self.match_mode == "fft":
+            max_val, max_loc = self.get_fft_matches(screenshot).get(state, (0.0, None))
+        else:
             result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, _ = cv2.minMaxLoc(result)
-            
-            if max_val > 0.7 and max_val > best_confidence:
-                best_confidence = max_val
-                best_match = state
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
         
-        return best_match
+        if max_val > self.match_threshold:
+            self.screen_origin = (max_loc[0], max_loc[1])
+            self.template_windows[state] = {"x": max_loc[0], "y": max_loc[1],
+                                            "width": template.shape[1], "height": template.shape[0]}
+        return max_val, max_loc
     
-    def navigate_to_starter_selection(self):
-        """Navega presionando A hasta llegar a selección de inicial"""
-        print("🎮 Navegando a selección de inicial...")
-        
-        # Región de captura - ajustar según tu configuración de emulador principal
-        capture_region = {"top": 50, "left": 50, "width": 800, "height": 600}
+    def candidate_order(self, expected=None):
+        """
+        Orden en que se prueban los templates: primero los estados esperados por el llamador,
+        luego los sucesores del último estado conocido (los más frecuentes antes) y al final el resto
+        """
+        from_state = self.last_known_state
+        successors = self.transitions.get(from_state, [])
+        expected = expected or ()
+        
+        def sort_key(state):
+            stats = self.transition_stats.get((from_state, state))
+            hits = stats['hits'] if stats else 0
+            rank = successors.index(state) if state in successors else len(successors)
+            return (state not in expected, state not in successors, -hits, rank)
+        
+        return sorted(self.templates, key=sort_key)
+    
+    def record_transition(self, tested_states, detected_state):
+        """Anota aciertos/fallos de cada template probado desde el último estado conocido"""
+        for state in tested_states:
+            stats = self.transition_stats.setdefault((self.last_known_state, state), {"hits": 0, "misses": 0})
+            stats["hits" if state == detected_state else "misses"] += 1
+    
+    def print_transition_stats(self):
+        """Muestra las estadísticas de transiciones acumuladas"""
+        if not self.transition_stats:
+            return
+        print("   🔀 Transiciones (aciertos/probados):")
+        for (from_state, state), stats in sorted(self.transition_stats.items()):
+            tested = stats["hits"] + stats["misses"]
+            print(f"      {self.state_names[from_state]} → {self.state_names[state]}: {stats['hits']}/{tested}")
+    
+    def screen_fingerprint(self, screenshot):
+        """
+        Huella perceptual de la pantalla GBA del frame; la ventana de la huella es la
+        primera ventana aprendida por un template (None mientras no haya ninguna)
+        """
+        if self.screen_index.window is None and self.template_windows:
+            self.screen_index.window = next(iter(self.template_windows.values()))
+        return self.screen_index.fingerprint(screenshot)
+    
+    def index_recorded_frames(self, frame_source, frames):
+        """
+        Alimenta el índice de huellas con frames grabados (p.ej. DirectoryFrameSource o
+        RecordedFrameSource) clasificándolos con template matching
+        """
+        use_screen_hash = self.use_screen_hash
+        self.use_screen_hash = False
+        try:
+            for _ in range(frames):
+                screenshot = frame_source.grab_bgr(self.capture_region)
+                state = self.match_templates(screenshot)
+                self.learn_fingerprint(self.screen_fingerprint(screenshot), state)
+        finally:
+            self.use_screen_hash = use_screen_hash
+        print(f"🔑 Índice de huellas: {len(self.screen_index.states)} pantallas conocidas")
+    
+    def detect_current_screen(self, screenshot, expected=None):
+        """
+        Detecta en qué pantalla estamos: primero por huella perceptual y, si la
+        búsqueda en el índice es ambigua, con template matching
+        """
+        if screenshot is None or not self.templates:
+            return self.UNKNOWN
         
-        for attempt in range(50):  # Máximo 50 intentos
-            print(f"   Intento {attempt + 1}: Presionando A...")
-            Press_A()
-            time.sleep(1.5)  # Esperar a que cambie la pantalla
-            
-            # Verificar si llegamos a selección de inicial
-            screenshot = self.capture_full_screen_region(capture_region)
-            current_screen = self.detect_current_screen(screenshot)
-            
-            if current_screen == self.STARTER_SELECTION:
-                print("✅ ¡Llegamos a la pantalla de selección de inicial!")
+        # Camino rápido: huella perceptual de la pantalla GBA contra el índice
+        fingerprint = None
+        if self.use_screen_hash:
+            fingerprint = self.screen_fingerprint(screenshot)
+            state = self.screen_index.lookup(fingerprint)
+            if state is not None and state != self.UNKNOWN:
+                self.last_known_state = state
+                return state
+            if state == self.UNKNOWN:
+                # Diálogos y fundidos: la huella solo vale si ningún template esperado asoma
+                # en su zona (unos parches pequeños en lugar del matching en frame completo)
+                if not self.any_template_in_window(screenshot, expected):
+                    return self.UNKNOWN
+                self.screen_index.discard(fingerprint, self.UNKNOWN)
+        
+        state = self.match_templates(screenshot, expected)
+        self.learn_fingerprint(fingerprint, state)
+        return state
+    
+    def any_template_in_window(self, screenshot, expected=None):
+        """
+        True si alguno de los templates esperados (todos si no se indica) supera el umbral
+        dentro de su ventana; también si alguno aún no tiene ventana (no se puede descartar)
+        """
+        for state in expected or self.templates:
+            if state not in self.templates:
+                continue
+            if not self.has_search_window(state):
+                return True
+            confidence, _ = self.match_template_in_window(screenshot, state)
+            if confidence >= self.match_threshold:
                 return True
-            
-            print(f"   Estado actual: {current_screen} (buscando {self.STARTER_SELECTION})")
-        
-        print("❌ No se pudo llegar a selección de inicial después de 50 intentos")
         return False
     
-    def select_treecko_and_continue(self):
-        """Selecciona Treecko y continúa hasta el combate"""
-        print("🦎 Seleccionando Treecko...")
-        
-        # Mover a la izquierda para seleccionar Treecko
-        Press_Izquierda()
-        time.sleep(0.8)
-        
-        # Confirmar selección de Treecko
-        Press_A()
-        time.sleep(2.0)
-        
-        print("🎮 Continuando hasta llegar al combate...")
-        
-        # Seguir presionando A hasta llegar al combate
-        capture_region = {"top": 50, "left": 50, "width": 800, "height": 600}
-        
-        for attempt in range(30):  # Máximo 30 intentos para llegar al combate
-            print(f"   Avanzando al combate - intento {attempt + 1}")
-            Press_A()
-            time.sleep(1.8)
+    def learn_fingerprint(self, fingerprint, state):
+        """
+        Aprende la huella de un frame ya clasificado. Un template solo con alta confianza
+        (un match justo taparía una pantalla que aún está llegando a su umbral); una huella
+        UNKNOWN (diálogos, fundidos) caduca y se verifica en cada uso (detect_current_screen)
+        """
+        if state == self.UNKNOWN:
+            self.screen_index.add(fingerprint, state, ttl=self.unknown_fingerprint_ttl)
+        elif self.last_match_confidence >= self.early_exit_confidence:
+            self.screen_index.add(fingerprint, state)
+    
+    def match_templates(self, screenshot, expected=None):
+        """
+        Clasifica el frame con template matching
+        Primero solo dentro de la ventana esperada de cada template (parches pequeños);
+        el frame completo solo se usa si ninguna ventana da un match
+        Los templates se prueban en orden de probabilidad y se para en el primero
+        que supere early_exit_confidence
+        """
+        order = self.candidate_order(expected)
+        
+        # Pantallas parecidas (selección de inicial / Treecko confirmado) superan el umbral
+        # normal entre sí: mientras algún template no tenga ventana no se puede descartar,
+        # así que un match en ventana solo vale si es de alta confianza
+        all_windows_known = all(self.has_search_window(state) for state in self.templates)
+        window_confidence = self.match_threshold if all_windows_known else self.early_exit_confidence
+        stages = ((self.match_template_in_window, window_confidence),
+                  (self.match_template_full_frame, self.match_threshold))
+        
+        for match, min_confidence in stages:
+            best_match = self.UNKNOWN
+            best_confidence = 0.0
+            tested = []
             
-            # Verificar si llegamos al combate
-            screenshot = self.capture_full_screen_region(capture_region)
-            current_screen = self.detect_current_screen(screenshot)
+            for state in order:
+                max_val, _ = match(screenshot, state)
+                tested.append(state)
+                
+                if max_val > self.match_threshold and max_val > best_confidence:
+                    best_confidence = max_val
+                    best_match = state
+                
+                if max_val >= self.early_exit_confidence:
+                    break
             
-            if current_screen == self.IN_BATTLE:
-                print("✅ ¡Llegamos al combate!")
-                return True
-            elif current_screen == self.TREECKO_CONFIRMED:
-                print("   Treecko confirmado, continuando...")
-                continue
+            if best_match != self.UNKNOWN and best_confidence >= min_confidence:
+                self.record_transition(tested, best_match)
+                self.last_known_state = best_match
+                self.last_match_confidence = best_confidence
+                return best_match
+        
+        self.last_match_confidence = 0.0
+        return self.UNKNOWN
+    
+    def frame_signature(self, screenshot):
+        """Miniatura gris del frame para detectar cambios de pantalla de forma barata"""
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (64, 48), interpolation=cv2.INTER_AREA).astype(np.int16)
+    
+    def signature_changed(self, a, b):
+        """True si dos miniaturas difieren más que transition_change_threshold"""
+        return float(np.mean(np.abs(a - b))) > self.transition_change_threshold
+    
+    def wait_for_transition(self, expected_states=(), timeout=2.0, baseline=None, step=None, min_brightness=None):
+        """
+        Sondea la pantalla cada transition_poll_interval hasta que:
+          - aparece uno de expected_states distinto del estado de baseline, o
+          - la pantalla cambia respecto a baseline y se mantiene estable
+        baseline: captura tomada ANTES de pulsar el botón (si es None se toma ahora)
+        step: nombre del paso en el perfil de tiempos; el timeout sale de lo medido
+              (sin pasar de timeout) y cada espera se anota como una muestra más
+        min_brightness: la pantalla estable solo cuenta si su brillo medio lo supera
+        Retorna el estado detectado en la última captura (también tras el timeout)
+        """
+        if baseline is None:
+            baseline = self.capture_full_screen_region(self.capture_region)
+        wait = TransitionWait(self, baseline, expected_states, timeout, step, min_brightness)
+        
+        while True:
+            screenshot = self.capture_full_screen_region(self.capture_region)
+            if wait.poll(screenshot):
+                break
+            time.sleep(self.transition_poll_interval)
         
-        print("⚠️  No se detectó pantalla de combate, pero continuando con detección de shiny...")
-        return True  # Asumir que llegamos al combate
+        self.last_transition_time = None if wait.timed_out else wait.elapsed
+        return wait.state
     
     def check_for_shiny_in_battle(self):
         """Verifica si el Treecko en combate es shiny"""
@@ -174,55 +573,54 @@ class GameNavigator:
                 print("❌ No se pudo cargar imagen de referencia")
                 return False
         
-        # PASO 2: Esperar un momento para asegurar que Treecko esté visible
-        print("⏱️  Esperando 3 segundos para asegurar que Treecko esté completamente visible...")
-        time.sleep(3.0)
-        
+        threshold = self.shiny_detector.similarity_threshold
+        # Banda dudosa bajo el umbral: la mitad del ancho de la banda normal (0.85-0.90 con 0.90)
+        shiny_below = threshold - (1.0 - threshold) / 2
         print("📊 Explicación de similitudes:")
-        print("   • 0.90-1.00 = Treecko NORMAL (muy parecido a referencia)")
-        print("   • 0.00-0.85 = Posible SHINY (muy diferente a referencia)")  
-        print("   • 0.000 = ERROR en captura/configuración")
+        print(f"   • {threshold:.2f}-1.00 = Treecko NORMAL (muy parecido a referencia)")
+        print(f"   • {shiny_below:.2f}-{threshold:.2f} = DUDOSO (similitud intermedia)")
+        print(f"   • 0.00-{shiny_below:.2f} = Posible SHINY (muy diferente a referencia)")
+        print("   • sin similitud = ERROR en captura/configuración")
         print()
         
-        # PASO 3: Verificar cada emulador CON debug
-        similarities = []
+        # PASO 2: Detección secuencial (SPRT) de TODOS los emuladores: en vez de esperar
+        # 3 segundos fijos, se analizan frames hasta tener evidencia suficiente
+        print("⏱️  Analizando frames hasta tener evidencia suficiente (SPRT)...")
+        sprt_start = time.time()
+        results = self.shiny_detector.detect_shiny_sequential(sct_instance=self.get_frame_source())
+        print(f"   ⏱️  Decisión en {time.time() - sprt_start:.2f} segundos")
+        similarities = [similarity for _, similarity, _, _ in results]
         
-        for emulator_id in range(len(self.shiny_detector.capture_regions)):
+        # PASO 3: Mostrar resultados CON debug (fuera del camino de detección)
+        for emulator_id, (decision, similarity, frames_used, image) in enumerate(results):
             try:
                 print(f"🔍 Analizando Emulador {emulator_id + 1}...")
                 
-                # Debug: mostrar región que se va a capturar
+                # Debug: mostrar región capturada
                 region = self.shiny_detector.capture_regions[emulator_id]
                 print(f"   📍 Región: ({region['left']}, {region['top']}) {region['width']}x{region['height']}")
+                print(f"   🧮 SPRT: {decision} tras {frames_used} frames")
                 
-                # Capturar imagen para debug
-                import mss
-                sct_debug = mss.mss()
-                captured_img = self.shiny_detector.capture_region_from_emulator(emulator_id, sct_debug)
+                # Sin decisión al vencer el timeout: ante la duda se usa el umbral de similitud
+                is_shiny = decision == SHINY or (decision == UNDECIDED and similarity is not None
+                                                 and similarity < threshold)
                 
-                if captured_img is not None:
-                    print(f"   ✅ Captura exitosa: {captured_img.shape[1]}x{captured_img.shape[0]} pixels")
+                if image is not None:
+                    print(f"   ✅ Captura exitosa: {image.shape[1]}x{image.shape[0]} pixels")
                     
                     # Guardar imagen capturada para debug
                     debug_filename = f"debug_capture_emulator{emulator_id+1}.png"
-                    cv2.imwrite(debug_filename, captured_img)
+                    cv2.imwrite(debug_filename, image)
                     print(f"   💾 Debug guardado: {debug_filename}")
                 else:
                     print(f"   ❌ Error en captura")
                     continue
                 
-                # Hacer la comparación con umbral ajustado
-                is_shiny, similarity, image = self.shiny_detector.check_emulator_for_shiny(emulator_id, similarity_threshold=0.90, sct_instance=sct_debug)
-                similarities.append(similarity)
-                
-                # Mostrar resultado con interpretación
-                if similarity == 0.000:
-                    status = "❌ ERROR"
-                    explanation = "(Problema en captura/coordenadas/referencia)"
-                elif similarity >= 0.90:
+                # Mostrar resultado con interpretación (sin captura válida no hay similitud)
+                if similarity >= threshold:
                     status = "✅ NORMAL"
                     explanation = "(Muy parecido a referencia)"
-                elif similarity < 0.85:
+                elif similarity < shiny_below:
                     status = "🌟 POSIBLE SHINY"
                     explanation = "(Muy diferente a referencia)"
                 else:
@@ -231,7 +629,7 @@ class GameNavigator:
                 
                 print(f"   📊 Similitud: {similarity:.3f} - {status} {explanation}")
                 
-                if is_shiny and similarity > 0.000:  # Solo considerar shiny si no hay error
+                if is_shiny:
                     print(f"\n🌟🌟🌟 ¡SHINY ENCONTRADO EN EMULADOR {emulator_id + 1}! 🌟🌟🌟")
                     print(f"Encuentros realizados: {self.encounters}")
                     print(f"Reinicios realizados: {self.resets}")
@@ -261,25 +659,23 @@ class GameNavigator:
                     # Marcar que se encontró shiny
                     self.shiny_found = True
                     
-                    sct_debug.close()
                     return True
                 
-                sct_debug.close()
-                
             except Exception as e:
                 print(f"   ❌ Error procesando Emulador {emulator_id + 1}: {e}")
         
         # Análisis de resultados
         print()
-        if all(sim == 0.000 for sim in similarities):
-            print("⚠️  TODOS los emuladores muestran similitud 0.000")
+        scored = [sim for sim in similarities if sim is not None]
+        if not scored:
+            print("⚠️  NINGÚN emulador dio una captura válida")
             print("🐛 Esto indica problema de integración entre main.py y detector")
             print("💡 Revisa los archivos debug_capture_emulator*.png generados")
             print("💡 Compara con: python Comparar_Imagen.py → Opción 3")
-        elif all(sim >= 0.95 for sim in similarities):
+        elif all(sim >= threshold for sim in scored):
             print("   ✅ Detección funcionando correctamente - Todos NORMALES")
-            print(f"   📊 Rango de similitudes: {min(similarities):.3f} - {max(similarities):.3f}")
-        elif any(sim < 0.90 for sim in similarities):
+            print(f"   📊 Rango de similitudes: {min(scored):.3f} - {max(scored):.3f}")
+        elif any(sim < shiny_below for sim in scored):
             print("   🌟 ¡POSIBLE SHINY DETECTADO!")
         else:
             print("   🤔 Similitudes dudosas - revisar manualmente")
@@ -300,10 +696,19 @@ class GameNavigator:
         if self.resets > 0:
             print(f"⏱️  Tiempo promedio por reinicio: {elapsed_time/self.resets:.1f} segundos")
         
-        # Soft reset del juego
-        print("🔄 Ejecutando SoftReset...")
-        SoftReset()
-        time.sleep(3.0)  # Pausa antes de limpiar pantalla
+        # Soft reset o carga de save state (ver reset_strategy.py)
+        strategy = self.reset_strategy
+        print(f"🔄 Reiniciando: {strategy.describe()}...")
+        baseline = self.capture_full_screen_region(self.capture_region)
+        handle = run_macro(strategy.macro(), hold=strategy.hold)
+        self.last_known_state = self.UNKNOWN  # tras el reset no se sabe en qué pantalla estamos
+        
+        # Esperar a que el juego vuelva a mostrar algo estable (antes 3 + 5 segundos fijos);
+        # el límite sale de los tiempos medidos en reinicios anteriores
+        self.wait_for_transition(timeout=strategy.timeout, baseline=baseline, step=strategy.timing_step,
+                                 min_brightness=strategy.min_brightness)
+        if handle.done.is_set() and handle.error is not None:
+            print(f"⚠️  Las teclas del reinicio no llegaron al emulador: {handle.error}")
         
         # VOLVER A LIMPIAR PANTALLA
         self.clear_screen()
@@ -313,64 +718,59 @@ class GameNavigator:
         print("="*60)
         print(f"🔄 REINICIO #{self.resets + 1} - ENCUENTRO #{self.encounters + 1}")
         print(f"⏱️  Tiempo total: {time.time() - self.start_time:.1f} segundos")
-        print("💡 Umbral ajustado: Shiny si similitud < 0.90")
+        if self.shiny_detector is not None:
+            print(f"💡 Umbral ajustado: Shiny si similitud < {self.shiny_detector.similarity_threshold:.2f}")
         print("="*60)
-        
-        time.sleep(5.0)  # Esperar a que se reinicie completamente
     
     def run_complete_shiny_hunt_cycle(self):
-        """Ejecuta UN ciclo completo de shiny hunting"""
+        """
+        Ejecuta UN ciclo completo de shiny hunting con la máquina de estados de hunt.py
+        (tabla de fases con presupuesto de tiempo y watchdog) sobre la región de este navegador;
+        la comprobación de shiny y el reinicio siguen siendo los de todos los emuladores
+        """
         print(f"\n🎯 === CICLO #{self.resets + 1} - BUSCANDO SHINY ===")
         
-        # PASO 1: Navegar a selección de inicial
-        if not self.navigate_to_starter_selection():
-            print("❌ Error navegando a selección de inicial")
-            return False
-        
-        # PASO 2: Seleccionar Treecko y llegar al combate
-        if not self.select_treecko_and_continue():
-            print("❌ Error seleccionando Treecko o llegando al combate")
-            return False
-        
-        # PASO 3: Buscar hasta llegar al menú de combate con Treecko visible
-        print("🎮 Esperando menú de combate con Treecko visible...")
-        
-        for attempt in range(100):  # Máximo 100 intentos
-            # Verificar estado actual
-            capture_region = {"top": 50, "left": 50, "width": 800, "height": 600}
-            screenshot = self.capture_full_screen_region(capture_region)
-            current_screen = self.detect_current_screen(screenshot)
-            
-            if current_screen == self.TREECKO_BATTLE_MENU:
-                print(f"⚔️  ¡Menú de combate con Treecko visible!")
-                
-                # AHORA SÍ - VERIFICAR SI ES SHINY
-                if self.check_for_shiny_in_battle():
-                    print("🎉 ¡SHINY ENCONTRADO! Deteniendo búsqueda.")
-                    return True  # Shiny encontrado - detener todo
-                
-                # NO ES SHINY - SOFTRESET INMEDIATO
-                print("   No es shiny → Haciendo SoftReset...")
-                self.reset_for_next_attempt()
-                return False  # Continuar con siguiente ciclo
-                
-            elif current_screen == self.IN_BATTLE:
-                print(f"   En combate - esperando menú completo...")
-                Press_A()  # Continuar para llegar al menú
-                time.sleep(1.0)
-                
-            else:
-                # Seguir avanzando hasta llegar al combate
-                print(f"   Avanzando - intento {attempt + 1}")
-                Press_A()
-                time.sleep(1.5)
-        
-        # Si llegamos aquí, no llegamos al menú de combate
-        print("⚠️  No se llegó al menú de combate después de 100 intentos")
-        self.reset_for_next_attempt()
-        return False  # Continuar buscando
-    
+        if self.hunt is None:
+            self.hunt = EmulatorHunt(0, self, self.shiny_detector, input_scheduler=get_scheduler(),
+                                     shiny_check=self.check_for_shiny_in_battle,
+                                     reset=self.reset_for_next_attempt, turbo=self.turbo_config)
+        hunt = self.hunt
+        cycles = hunt.cycles
+        HuntScheduler([hunt]).run(until=lambda: hunt.cycles > cycles)
+        return hunt.shiny_found
+
+
+
+# Backends con un canal de entrada por emulador: los únicos válidos para la caza concurrente
+# (pyautogui/pynput escriben en la ventana con foco y mezclarían las teclas de todas las cazas)
+CONCURRENT_INPUT_BACKENDS = ("postmessage", "fake")
+
 
+def build_emulator_hunts(detector, backend_name, frame_source=None, reset_strategy=None, turbo=None):
+    """
+    Una máquina de estados por emulador (ver hunt.py), cada una con la región de su ventana
+    y su propio canal de entrada: con "postmessage" las teclas van a la ventana de cada emulador
+    """
+    if backend_name not in CONCURRENT_INPUT_BACKENDS:
+        raise ValueError(f"La caza concurrente necesita un canal de entrada por emulador "
+                         f"({', '.join(CONCURRENT_INPUT_BACKENDS)}), no '{backend_name}'")
+    windows = emulator_windows() if backend_name == "postmessage" else []
+    hunts = []
+    for emulator_id in range(NUM_EMULATORS):
+        navigator = GameNavigator(frame_source=frame_source, capture_region=emulator_region(emulator_id))
+        if detector is not None and detector.config:
+            navigator.apply_config(detector.config)
+        if reset_strategy is not None:
+            navigator.reset_strategy = reset_strategy
+        if backend_name == "postmessage":
+            if emulator_id >= len(windows):
+                print(f"⚠️  No se encontró la ventana del emulador {emulator_id + 1}")
+                continue
+            backend = create_input_backend("postmessage", hwnd=windows[emulator_id])
+        else:
+            backend = create_input_backend("fake")
+        hunts.append(EmulatorHunt(emulator_id, navigator, detector, backend, turbo=turbo))
+    return hunts
 
 
 def main():
@@ -385,7 +785,7 @@ def main():
         return
     
     procesos_emuladores = abrir_emuladores()
-    if not procesos_emuladores:
+    if not any(procesos_emuladores):
         print("❌ Error abriendo emuladores")
         return
     
@@ -404,6 +804,33 @@ def main():
         print("💡 Asegúrate de tener configurado coordinates/emulator_coordinates.json")
         return
     
+    # Modo de matching de pantallas ("full", "pyramid" o "fft") y huellas desde la configuración
+    if navigator.shiny_detector.config:
+        navigator.apply_config(navigator.shiny_detector.config)
+        
+        # Backend de teclado ("pyautogui", "pynput", "postmessage" o "fake") desde la configuración
+        # ("postmessage" necesita la ventana de cada emulador: se crea por emulador en build_emulator_hunts)
+        backend_name = navigator.shiny_detector.config.get('input_backend', DEFAULT_INPUT_BACKEND)
+        if backend_name != "postmessage":
+            try:
+                set_input_backend(create_input_backend(backend_name))
+                print(f"✅ Backend de entrada: {backend_name}")
+            except Exception as e:
+                print(f"⚠️  No se pudo crear el backend de entrada '{backend_name}': {e}")
+    
+        # Estrategia de reinicio: "soft_reset" o {"type": "save_state", "slot": 1, ...}
+        try:
+            navigator.reset_strategy = create_reset_strategy(
+                navigator.shiny_detector.config.get('reset_strategy', 'soft_reset'))
+            print(f"✅ Reinicio: {navigator.reset_strategy.describe()}")
+        except Exception as e:
+            print(f"⚠️  Estrategia de reinicio inválida, se usa soft reset: {e}")
+    
+        # Turbo (Space) durante los diálogos: {"enabled": true, "speed": 4.0, ...}
+        navigator.turbo_config = navigator.shiny_detector.config.get('turbo', {})
+        if navigator.turbo_config.get('enabled'):
+            print(f"✅ Turbo en navegación (x{navigator.turbo_config.get('speed', 4.0)})")
+    
     # PASO 3: Esperar a que el usuario esté listo
     print("\n📋 PREPARACIÓN:")
     print("1. Asegúrate de que los emuladores estén en la pantalla inicial del juego")
@@ -416,10 +843,47 @@ def main():
     print("\n🚀 ¡INICIANDO SHINY HUNTING AUTOMATIZADO!")
     print("💡 Presiona Ctrl+C para detener en cualquier momento")
     
+    # "lockstep" = un solo navegador para todos; "concurrent" = una máquina de estados por emulador
+    hunt_mode = navigator.shiny_detector.config.get('hunt_mode', 'lockstep') if navigator.shiny_detector.config else 'lockstep'
+    hunts = []
+    scheduler = None
+    if hunt_mode == "concurrent":
+        backend_name = navigator.shiny_detector.config.get('input_backend', DEFAULT_INPUT_BACKEND)
+        if backend_name in CONCURRENT_INPUT_BACKENDS:
+            hunts = build_emulator_hunts(navigator.shiny_detector, backend_name,
+                                         reset_strategy=navigator.reset_strategy,
+                                         turbo=navigator.turbo_config)
+            # Un solo planificador para toda la ejecución: se cierra al encontrar shiny y al salir
+            scheduler = HuntScheduler(hunts)
+            print(f"🔀 Caza concurrente: {len(hunts)} máquinas de estados")
+        else:
+            print(f"⚠️  Con '{backend_name}' las teclas solo llegan a la ventana con foco: la caza concurrente "
+                  f"necesita \"input_backend\": \"postmessage\". Se usa el modo lockstep")
+            hunt_mode = "lockstep"
+    
+    # Supervisor: relanza los emuladores que se cierran o se cuelgan sin parar a los demás
+    supervisor_config = dict(DEFAULT_SUPERVISOR_CONFIG,
+                             **(navigator.shiny_detector.config or {}).get('supervisor', {}))
+    supervisor = None
+    if supervisor_config.pop('enabled'):
+        supervisor = EmulatorSupervisor(procesos_emuladores, hunts=hunts, active=lambda: not navigator.shiny_found,
+                                        backend=None if hunts else get_scheduler().backend,
+                                        lockstep=None if hunts else lambda: navigator.hunt,
+                                        **supervisor_config).start()
+        print(f"🚑 Supervisor activo (congelado = {supervisor.freeze_timeout:.0f} s sin cambios)")
+    
     try:
         while True:
-            # Ejecutar un ciclo completo
-            shiny_found = navigator.run_complete_shiny_hunt_cycle()
+            if scheduler is not None:
+                shiny_found = bool(scheduler.run())
+                navigator.resets = sum(hunt.resets for hunt in hunts)
+                navigator.encounters = sum(hunt.encounters for hunt in hunts)
+                navigator.shiny_found = shiny_found
+                if shiny_found:
+                    scheduler.close()  # los demás emuladores no siguen pulsando teclas a medio ciclo
+            else:
+                # Ejecutar un ciclo completo
+                shiny_found = navigator.run_complete_shiny_hunt_cycle()
             
             if shiny_found:
                 print("\n🎊 ¡SHINY HUNTING COMPLETADO EXITOSAMENTE!")
@@ -444,6 +908,13 @@ def main():
         print(f"\n❌ Error durante shiny hunting: {e}")
     finally:
         # PASO 5: Limpieza final - solo si el usuario quiere cerrar
+        if supervisor is not None:
+            supervisor.stop()
+        if scheduler is not None:
+            scheduler.close()  # canales de entrada de cada caza: sueltan sus teclas
+        if navigator.hunt is not None:
+            get_scheduler().cancel()  # lockstep: descarta las teclas pendientes y suelta las pulsadas
+            navigator.hunt.close()    # y apaga el turbo si quedó encendido
         print("\n🔧 Cerrando emuladores...")
         try:
             cerrar_emuladores(procesos_emuladores)
@@ -461,6 +932,28 @@ def main():
             print(f"   ⏱️  Tiempo promedio por reinicio: {total_time/navigator.resets:.1f} segundos")
         if navigator.encounters > 0:
             print(f"   ⏱️  Tiempo promedio por encuentro: {total_time/navigator.encounters:.1f} segundos")
+        navigator.print_transition_stats()
+        navigator.timing.save()
+        backend = get_input_backend()
+        if backend is not None and backend.events:
+            stats = backend.latency_stats()
+            print(f"   ⌨️  Entrada ({backend.name}): {stats['events']} eventos - "
+                  f"p50 {stats['p50_ms']:.2f} ms - p99 {stats['p99_ms']:.2f} ms - max {stats['max_ms']:.2f} ms")
+        timing_lines = navigator.timing.summary()
+        if timing_lines:
+            print("   ⏱️  Tiempos medidos:")
+            for line in timing_lines:
+                print(f"      {line}")
+        if supervisor is not None:
+            for line in supervisor.summary():
+                print(f"   🚑 {line}")
+        abort_lines = abort_summary(hunts if hunts else [navigator.hunt] if navigator.hunt else [])
+        if abort_lines:
+            print("   ⏰ Watchdog:")
+            for line in abort_lines:
+                print(f"      {line}")
+        if navigator.screen_index.lookups:
+            print(f"   🔑 Huellas: {navigator.screen_index.hits}/{navigator.screen_index.lookups} pantallas resueltas sin template matching")
         
         print("\n👋 ¡Gracias por usar el sistema de shiny hunting!")
         
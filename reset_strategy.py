@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+reset_strategy.py - Cómo volver al principio de cada intento
+  soft_reset: A+B+Start+Select y pulsar A desde la pantalla de título hasta la selección de inicial
+  save_state: cargar un save state (Shift+F1-F4 en VBA-M) hecho justo antes de la mochila de Birch
+
+Cada estrategia dice qué teclas enviar, cómo esperar a que termine y en qué fase
+de la caza (ver hunt.py) se continúa, para no recorrer fases que ya no hacen falta.
+"""
+
+import random
+
+
+class ResetStrategy:
+    """
+    Interfaz común:
+      macro()        -> pasos de Control.compile_macro para reiniciar
+      hold           -> segundos con las teclas pulsadas
+      timeout        -> límite de la espera al cambio de pantalla tras reiniciar
+      timing_step    -> nombre del paso en el perfil de tiempos
+      min_brightness -> brillo mínimo para dar el reinicio por terminado (None = cualquiera)
+      start_phase    -> fase de la caza desde la que se sigue
+      budget         -> presupuesto de la fase de reinicio para el watchdog
+    """
+
+    name = "base"
+    hold = 0.1
+    timeout = 2.0
+    timing_step = None
+    min_brightness = None
+    start_phase = "navigate"
+    budget = 12.0
+
+    def macro(self):
+        raise NotImplementedError
+
+    def describe(self):
+        return self.name
+
+
+class SoftResetStrategy(ResetStrategy):
+    """Soft reset del juego: vuelve a la pantalla de título (pantalla negra de por medio)"""
+
+    name = "soft_reset"
+    hold = 0.2        # las cuatro teclas juntas 200ms (suele ser suficiente)
+    timeout = 8.0     # antes 3 + 5 segundos fijos
+    timing_step = "soft_reset"
+
+    def __init__(self, min_brightness=20):
+        self.min_brightness = min_brightness
+
+    def macro(self):
+        return ["A+B+START+SELECT"]
+
+
+class SaveStateResetStrategy(ResetStrategy):
+    """
+    Carga el save state del slot (1-4) con Shift+F<slot>
+    El save state fija también el RNG: sin variar cuántos frames pasan antes de elegir,
+    saldría siempre el mismo Treecko. jitter añade una pausa aleatoria tras cargar.
+    """
+
+    name = "save_state"
+    timeout = 1.5     # cargar es casi instantáneo: no hay pantalla negra que esperar
+    timing_step = "load_state"
+    budget = 5.0
+
+    def __init__(self, slot=1, jitter=0.5, start_phase="navigate"):
+        if slot not in (1, 2, 3, 4):
+            raise ValueError(f"Slot de save state inválido: {slot} (1-4)")
+        self.slot = slot
+        self.jitter = jitter
+        self.start_phase = start_phase
+
+    def macro(self):
+        steps = [f"SHIFT+F{self.slot}"]
+        if self.jitter > 0:
+            steps.append(random.uniform(0.0, self.jitter))
+        return steps
+
+    def describe(self):
+        return f"{self.name} (slot {self.slot}, jitter {self.jitter:.2f} s, desde '{self.start_phase}')"
+
+
+RESET_STRATEGIES = {
+    "soft_reset": SoftResetStrategy,
+    "save_state": SaveStateResetStrategy,
+}
+
+
+def create_reset_strategy(spec="soft_reset", **kwargs):
+    """
+    Crea una estrategia por nombre o desde la configuración:
+      "soft_reset"
+      {"type": "save_state", "slot": 1, "jitter": 0.5, "start_phase": "navigate"}
+    """
+    if isinstance(spec, dict):
+        kwargs = dict(spec, **kwargs)
+        spec = kwargs.pop("type", "soft_reset")
+    strategy_class = RESET_STRATEGIES.get(spec)
+    if strategy_class is None:
+        raise ValueError(f"Estrategia de reinicio desconocida: {spec}")
+    return strategy_class(**kwargs)
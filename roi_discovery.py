@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+roi_discovery.py - Encuentra la región del Treecko en cada captura sin coordinate_selector.py
+Busca reference/treecko_normal.png en cada captura de img_treecko/ con template matching
+multiescala (barrido grueso y refinado alrededor de la mejor escala), todas las capturas
+en paralelo, y escribe la región ajustada de cada emulador en la configuración.
+
+Uso: python roi_discovery.py [--images img_treecko] [--reference reference/treecko_normal.png] [--dry-run]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+CONFIG_PATH = "coordinates/emulator_coordinates.json"
+DEFAULT_SCALES = (0.5, 2.0)   # rango de escalas del sprite respecto a la referencia
+COARSE_STEPS = 16             # escalas del barrido grueso
+FINE_STEPS = 9                # escalas del refinado alrededor de la mejor
+MIN_SCORE = 0.6               # correlación mínima para aceptar una región
+
+
+def match_at_scale(screenshot, reference, scale):
+    """(correlación, x, y, ancho, alto) del mejor match de la referencia escalada"""
+    width = int(round(reference.shape[1] * scale))
+    height = int(round(reference.shape[0] * scale))
+    if width < 8 or height < 8 or width > screenshot.shape[1] or height > screenshot.shape[0]:
+        return None
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    template = cv2.resize(reference, (width, height), interpolation=interpolation)
+    result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return float(max_val), max_loc[0], max_loc[1], width, height
+
+
+def find_sprite(screenshot, reference, scales=DEFAULT_SCALES, coarse_steps=COARSE_STEPS, fine_steps=FINE_STEPS):
+    """
+    Busca la referencia en la captura a varias escalas
+    Retorna {"score", "scale", "x", "y", "width", "height"} o None si no cabe a ninguna escala
+    """
+    def best_of(candidates):
+        best = None
+        for scale in candidates:
+            match = match_at_scale(screenshot, reference, scale)
+            if match is not None and (best is None or match[0] > best[1][0]):
+                best = (scale, match)
+        return best
+
+    # Barrido geométrico grueso y refinado entre las escalas vecinas de la mejor
+    coarse = np.geomspace(scales[0], scales[1], coarse_steps)
+    best = best_of(coarse)
+    if best is None:
+        return None
+    ratio = coarse[1] / coarse[0] if len(coarse) > 1 else 1.0
+    fine = np.geomspace(best[0] / ratio, best[0] * ratio, fine_steps)
+    refined = best_of(fine)
+    if refined is not None and refined[1][0] > best[1][0]:
+        best = refined
+
+    scale, (score, x, y, width, height) = best
+    return {"score": score, "scale": float(scale), "x": x, "y": y, "width": width, "height": height}
+
+
+def emulator_id_from_path(path):
+    """Número de emulador del nombre de la captura (emulador3_... -> 3)"""
+    match = re.search(r"emulador(\d+)", os.path.basename(path))
+    return int(match.group(1)) if match else None
+
+
+def discover_rois(image_paths, reference_path, workers=None):
+    """
+    Busca el sprite en todas las capturas en paralelo (OpenCV suelta el GIL)
+    Retorna {ruta: resultado de find_sprite (más "frame_size" de la captura) o None}
+    """
+    reference = cv2.imread(reference_path)
+    if reference is None:
+        raise FileNotFoundError(f"No se pudo cargar la referencia {reference_path}")
+
+    def search(path):
+        screenshot = cv2.imread(path)
+        if screenshot is None:
+            return None
+        found = find_sprite(screenshot, reference)
+        if found is not None:
+            found["frame_size"] = [screenshot.shape[1], screenshot.shape[0]]  # (ancho, alto) de la ventana
+        return found
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(image_paths), os.cpu_count() or 4) or 1) as pool:
+        return dict(zip(image_paths, pool.map(search, image_paths)))
+
+
+def apply_to_config(config, results, min_score=MIN_SCORE):
+    """
+    Escribe las regiones encontradas en config["emulators"] (crea los que falten)
+    Las capturas son de la ventana: si la configuración tiene window_region (grid_layout.py)
+    la región se pasa a coordenadas absolutas
+    Retorna el número de emuladores actualizados
+    """
+    emulators = {emu.get("id"): emu for emu in config.setdefault("emulators", [])}
+    updated = 0
+    for path, found in sorted(results.items()):
+        emulator_id = emulator_id_from_path(path)
+        if emulator_id is None or found is None or found["score"] < min_score:
+            continue
+
+        emulator = emulators.get(emulator_id)
+        if emulator is None:
+            emulator = {"id": emulator_id, "name": f"Emulador_{emulator_id}"}
+            config["emulators"].append(emulator)
+            emulators[emulator_id] = emulator
+        window = emulator.get("window_region", {"x": 0, "y": 0})
+        emulator["screenshot_path"] = path
+        emulator["pokemon_region"] = {"x": window["x"] + found["x"], "y": window["y"] + found["y"],
+                                      "width": found["width"], "height": found["height"]}
+        updated += 1
+
+        # La cuadrícula se vuelve a generar desde la región medida (relativa a la ventana)
+        layout = config.get("layout")
+        if layout and emulator_id == 1:
+            layout["reference_roi"] = {key: found[key] for key in ("x", "y", "width", "height")}
+            if "frame_size" in found:
+                # La región es relativa a esta captura: su tamaño es el de la ventana de referencia
+                layout["reference_size"] = list(found["frame_size"])
+
+    config["emulators"].sort(key=lambda emu: emu.get("id", 0))
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detecta la región del Treecko en las capturas de los emuladores")
+    parser.add_argument("--images", default="img_treecko", help="carpeta con las capturas (emuladorN_*.png)")
+    parser.add_argument("--reference", default="reference/treecko_normal.png")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--dry-run", action="store_true", help="solo mostrar las regiones")
+    args = parser.parse_args()
+
+    image_paths = sorted(glob.glob(os.path.join(args.images, "*.png")))
+    if not image_paths:
+        print(f"❌ No se encontraron capturas en {args.images}/")
+        print("💡 Ejecuta auto_screenshot_emulators.py primero")
+        return
+
+    results = discover_rois(image_paths, args.reference)
+    for path, found in sorted(results.items()):
+        if found is None:
+            print(f"❌ {path}: sin resultado")
+            continue
+        mark = "✅" if found["score"] >= args.min_score else "⚠️ "
+        print(f"{mark} {os.path.basename(path)}: ({found['x']}, {found['y']}) {found['width']}x{found['height']} "
+              f"- escala {found['scale']:.2f} - correlación {found['score']:.3f}")
+
+    if args.dry_run:
+        return
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    updated = apply_to_config(config, results, args.min_score)
+    config.setdefault("reference_image", args.reference)
+    os.makedirs(os.path.dirname(args.config) or ".", exist_ok=True)
+    with open(args.config, 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    print(f"💾 {updated} regiones guardadas en {args.config}")
+
+
+if __name__ == "__main__":
+    main()
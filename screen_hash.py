@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+screen_hash.py - Huella perceptual (dHash) de pantallas para clasificar sin template matching
+Un frame se reduce a una huella de hash_size x hash_size bits y se busca la huella conocida
+más cercana por distancia de Hamming. Solo si el resultado es ambiguo hace falta matchTemplate.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+
+def dhash(image, hash_size=16):
+    """dHash: compara cada pixel con su vecino derecho en una versión gris reducida"""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+class ScreenHashIndex:
+    """
+    Índice de huellas de pantallas conocidas (templates y frames ya clasificados)
+    Todas las huellas se calculan sobre la misma ventana del frame: la pantalla GBA
+    Una huella puede caducar (ttl): deja de contar si pasan ttl segundos sin que nadie la use
+    """
+
+    def __init__(self, hash_size=16, max_distance=16, margin=16, max_entries=512):
+        self.hash_size = hash_size
+        self.max_distance = max_distance  # distancia máxima para aceptar un match
+        self.margin = margin              # ventaja mínima sobre el mejor estado distinto
+        self.max_entries = max_entries
+        self.window = None                # {"x", "y", "width", "height"} dentro del frame
+        self.hashes = np.zeros((0, hash_size * hash_size), dtype=bool)
+        self.states = []
+        self.expiry = np.zeros(0)         # instante en que caduca cada huella (inf = nunca)
+        self.ttl = np.zeros(0)            # segundos que se renueva cada huella al usarla
+        self.lookups = 0
+        self.hits = 0
+
+    def add_image(self, state, image):
+        """Añade una imagen ya recortada (p.ej. un template) con su estado"""
+        self.add(dhash(image, self.hash_size), state)
+
+    def add(self, fingerprint, state, ttl=None):
+        """Añade una huella si no hay ya una casi idéntica del mismo estado (ttl None = no caduca)"""
+        if fingerprint is None:
+            return False
+        if len(self.states) >= self.max_entries:
+            self.keep(self.expiry > time.perf_counter())
+            if len(self.states) >= self.max_entries:
+                return False
+        if self.states:
+            distances = np.count_nonzero(self.hashes != fingerprint, axis=1)
+            same_state = np.array([s == state for s in self.states])
+            if np.any(same_state & (distances <= self.max_distance // 4)):
+                return False
+        ttl = np.inf if ttl is None else ttl
+        self.hashes = np.vstack([self.hashes, fingerprint])
+        self.states.append(state)
+        self.expiry = np.append(self.expiry, time.perf_counter() + ttl)
+        self.ttl = np.append(self.ttl, ttl)
+        return True
+
+    def discard(self, fingerprint, state):
+        """Quita las huellas de state cercanas a fingerprint (p.ej. una que resultó errónea)"""
+        if fingerprint is None or not self.states:
+            return
+        distances = np.count_nonzero(self.hashes != fingerprint, axis=1)
+        same_state = np.array([s == state for s in self.states])
+        self.keep(~(same_state & (distances <= self.max_distance)))
+
+    def keep(self, mask):
+        """Se queda solo con las huellas marcadas en mask"""
+        self.hashes = self.hashes[mask]
+        self.states = [s for s, kept in zip(self.states, mask) if kept]
+        self.expiry = self.expiry[mask]
+        self.ttl = self.ttl[mask]
+
+    def fingerprint(self, screenshot):
+        """Huella de la ventana de pantalla del frame (None si aún no se conoce la ventana)"""
+        window = self.window
+        if window is None or screenshot is None:
+            return None
+        x, y = max(0, window['x']), max(0, window['y'])
+        crop = screenshot[y:y + window['height'], x:x + window['width']]
+        if crop.shape[0] < self.hash_size or crop.shape[1] < self.hash_size + 1:
+            return None
+        return dhash(crop, self.hash_size)
+
+    def lookup(self, fingerprint):
+        """
+        Estado de la huella conocida más cercana, o None si no hay ninguna suficientemente
+        cerca o si otro estado está casi igual de cerca (ambiguo)
+        """
+        if fingerprint is None or not self.states:
+            return None
+        self.lookups += 1
+
+        now = time.perf_counter()
+        distances = np.count_nonzero(self.hashes != fingerprint, axis=1)
+        distances[self.expiry <= now] = fingerprint.size + 1  # caducadas: como si no estuvieran
+        best = int(np.argmin(distances))
+        best_state = self.states[best]
+        if distances[best] > self.max_distance:
+            return None
+
+        others = [d for d, s in zip(distances, self.states) if s != best_state]
+        if others and min(others) - distances[best] < self.margin:
+            return None
+
+        self.hits += 1
+        self.expiry[best] = now + self.ttl[best]
+        return best_state
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+supervisor.py - Vigila los emuladores mientras dura la caza
+Un hilo aparte comprueba cada emulador: si su proceso murió o su pantalla lleva
+freeze_timeout segundos sin cambiar, lo cierra, lo relanza en la misma posición de
+la cuadrícula y devuelve su máquina de estados a la caza. Los demás no se detienen.
+En modo lockstep (una sola máquina para todos) la caza se pausa durante el relanzamiento
+y vuelve por el reinicio, que deja a todos los emuladores otra vez en el mismo punto.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from AbrirEmulador import emulator_region, relanzar_emulador, detener_emulador
+
+DEFAULT_SUPERVISOR_CONFIG = {
+    "enabled": True,
+    "check_interval": 1.0,    # segundos entre comprobaciones
+    "freeze_timeout": 20.0,   # segundos sin cambio de pantalla para dar un emulador por colgado
+    "change_threshold": 2.0,  # diferencia media (0-255) de la miniatura para considerar que cambió
+    "retry_delay": 30.0,      # segundos antes de reintentar un relanzamiento fallido
+}
+
+
+class EmulatorSupervisor:
+    """
+    processes: lista de procesos por posición, None si no arrancó (se actualiza en el sitio
+               al relanzar, así cerrar_emuladores() cierra los nuevos)
+    hunts:     EmulatorHunt por emulador (modo concurrente) para suspenderlas y reengancharlas
+    lockstep:  callable() -> EmulatorHunt compartida del modo lockstep (o None si aún no existe)
+    active:    callable() -> bool; con False (p.ej. shiny encontrado) no se toca ningún emulador
+    backend:   backend de entrada compartido (modo lockstep); con hunts se usa el de cada una
+    Solo cuenta como congelado un emulador que no cambia aunque se le estén enviando teclas
+    """
+
+    def __init__(self, processes, hunts=None, active=None, backend=None, frame_source=None, check_interval=1.0,
+                 freeze_timeout=20.0, change_threshold=2.0, retry_delay=30.0, lockstep=None):
+        self.processes = processes
+        self.hunts = {hunt.emulator_id: hunt for hunt in hunts or []}
+        self.lockstep = lockstep
+        self.active = active
+        self.backend = backend
+        self.frame_source = frame_source
+        self.check_interval = check_interval
+        self.freeze_timeout = freeze_timeout
+        self.change_threshold = change_threshold
+        self.retry_delay = retry_delay
+
+        self.signatures = {}      # índice -> (miniatura, instante del último cambio, eventos de entrada entonces)
+        self.retry_after = {}     # índice -> instante a partir del cual reintentar
+        self.relaunches = {}      # índice -> veces relanzado
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="EmulatorSupervisor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _run(self):
+        if self.frame_source is None:
+            try:
+                from frame_source import MSSFrameSource
+                self.frame_source = MSSFrameSource()
+            except Exception as e:
+                print(f"⚠️  Supervisor sin captura de pantalla (solo procesos): {e}")
+        else:
+            self.frame_source = self.frame_source.for_thread()
+
+        while not self._stop.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠️  Error en el supervisor: {e}")
+
+    def watched(self, index):
+        """False si el emulador no debe tocarse (caza terminada, p.ej. con su shiny en pantalla)"""
+        if self.active is not None and not self.active():
+            return False
+        hunt = self.hunts.get(index)
+        return hunt is None or not hunt.finished
+
+    def signature(self, index):
+        frame = self.frame_source.grab(emulator_region(index))
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+        return cv2.resize(gray, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def input_events(self, index):
+        """Eventos de teclado enviados hasta ahora al emulador index"""
+        hunt = self.hunts.get(index)
+        backend = hunt.input.backend if hunt is not None else self.backend
+        return backend.events if backend is not None else 0
+
+    def frozen(self, index, now):
+        """True si la pantalla lleva freeze_timeout segundos sin cambiar pese a recibir teclas"""
+        if self.frame_source is None:
+            return False
+        signature = self.signature(index)
+        events = self.input_events(index)
+        previous = self.signatures.get(index)
+        if previous is None or float(np.mean(np.abs(signature - previous[0]))) > self.change_threshold:
+            self.signatures[index] = (signature, now, events)
+            return False
+        _, changed_at, events_then = previous
+        self.signatures[index] = (signature, changed_at, events_then)
+        return now - changed_at > self.freeze_timeout and events > events_then
+
+    def check(self):
+        """Una pasada por todos los emuladores"""
+        now = time.time()
+        for index, process in enumerate(self.processes):
+            if not self.watched(index) or now < self.retry_after.get(index, 0):
+                continue
+            if process is None:
+                self.replace(index, "no llegó a arrancar")
+            elif process.poll() is not None:
+                self.replace(index, f"el proceso terminó (código {process.returncode})")
+            elif self.frozen(index, now):
+                self.replace(index, f"pantalla congelada más de {self.freeze_timeout:.0f} segundos")
+
+    def replace(self, index, reason):
+        """Cierra el emulador index, lo relanza en su posición y lo devuelve a la caza"""
+        print(f"🚑 Supervisor: emulador {index+1} - {reason} → relanzando")
+        hunt = self.hunts.get(index)
+        shared = self.lockstep() if hunt is None and self.lockstep is not None else None
+        if hunt is not None:
+            hunt.suspend()
+        elif shared is not None:
+            shared.suspend()
+
+        detener_emulador(self.processes[index])
+        process, hwnd = relanzar_emulador(index)
+        self.signatures.pop(index, None)
+        if shared is not None:
+            # Los demás siguen aunque el relanzamiento falle; el reinicio de todos resincroniza
+            # el emulador nuevo (misma región y teclas compartidas: no hay nada que cambiar)
+            shared.rejoin()
+        if process is None:
+            print(f"✗ Supervisor: no se pudo relanzar el emulador {index+1}; "
+                  f"reintento en {self.retry_delay:.0f} segundos")
+            self.retry_after[index] = time.time() + self.retry_delay
+            return False
+
+        self.processes[index] = process
+        self.relaunches[index] = self.relaunches.get(index, 0) + 1
+        if hunt is not None:
+            hunt.rejoin(emulator_region(index), hwnd)
+        return True
+
+    def summary(self):
+        """Líneas 'Emulador N: relanzado X veces'"""
+        return [f"Emulador {index+1}: relanzado {count} veces" for index, count in sorted(self.relaunches.items())]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+timing_profile.py - Tiempos medidos de cada paso (transiciones, soft reset, arranque del emulador)
+Guarda las últimas muestras de cada paso en coordinates/timing_profile.json para que los
+delays y timeouts de ejecuciones siguientes salgan de datos medidos en esta máquina.
+Todos los navegadores, cazas y el relanzamiento de emuladores comparten un mismo perfil
+(get_timing_profile); al guardar, las muestras nuevas se mezclan con las del archivo.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+TIMING_PROFILE_PATH = "coordinates/timing_profile.json"
+
+
+class TimingProfile:
+    """
+    Percentiles móviles por paso
+    delay(paso, defecto)   -> espera fija mínima segura (p95 con margen)
+    timeout(paso, defecto) -> límite de una espera por eventos (p99 con margen, nunca mayor que el defecto)
+    Hasta tener min_samples muestras de un paso se usa el valor por defecto
+    """
+
+    def __init__(self, path=TIMING_PROFILE_PATH, window=200, min_samples=5, safety_margin=1.25):
+        self.path = path
+        self.window = window
+        self.min_samples = min_samples
+        self.safety_margin = safety_margin
+        self.samples = {}             # paso -> deque de duraciones en segundos
+        self.pending = {}             # paso -> muestras medidas desde el último save()
+        self._lock = threading.Lock()
+        self.load()
+
+    def read_samples(self):
+        """Muestras del archivo ({paso: [duraciones]}); None si no existe o no se puede leer"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f).get('samples', {})
+        except Exception as e:
+            print(f"⚠️  Error cargando perfil de tiempos {self.path}: {e}")
+            return None
+
+    def load(self):
+        """Carga las muestras guardadas (si el archivo existe)"""
+        samples = self.read_samples()
+        if samples is None:
+            return False
+        with self._lock:
+            self.samples = {step: deque(values, maxlen=self.window) for step, values in samples.items()}
+        return True
+
+    def save(self):
+        """
+        Guarda las muestras: las medidas desde el último save() se añaden a las del archivo,
+        así no se pierden las que otro perfil guardó entretanto (escritura atómica)
+        """
+        with self._lock:
+            on_disk = self.read_samples()
+            if on_disk is None:
+                merged = {step: deque(values, maxlen=self.window) for step, values in self.samples.items()}
+            else:
+                merged = {step: deque(values, maxlen=self.window) for step, values in on_disk.items()}
+                for step, values in self.pending.items():
+                    merged.setdefault(step, deque(maxlen=self.window)).extend(values)
+            data = {'samples': {step: [round(v, 4) for v in values] for step, values in merged.items()}}
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                print(f"⚠️  Error guardando perfil de tiempos {self.path}: {e}")
+                return False
+            self.samples = merged
+            self.pending = {}
+            return True
+
+    def record(self, step, seconds):
+        """Añade una duración medida de un paso"""
+        with self._lock:
+            self.samples.setdefault(step, deque(maxlen=self.window)).append(float(seconds))
+            self.pending.setdefault(step, []).append(float(seconds))
+
+    def percentile(self, step, q):
+        """Percentil q de las muestras de un paso (None si aún no hay suficientes)"""
+        with self._lock:
+            values = list(self.samples.get(step, ()))
+        if len(values) < self.min_samples:
+            return None
+        return float(np.percentile(values, q))
+
+    def delay(self, step, default):
+        """Espera fija mínima segura para un paso que no se puede observar"""
+        p95 = self.percentile(step, 95)
+        return default if p95 is None else p95 * self.safety_margin
+
+    def timeout(self, step, default, floor=0.1):
+        """Límite de una espera por eventos: lo medido con margen, sin pasar del defecto"""
+        p99 = self.percentile(step, 99)
+        if p99 is None:
+            return default
+        return min(default, max(floor, p99 * self.safety_margin * 2))
+
+    def summary(self):
+        """Líneas 'paso: p50/p95 (n)' para mostrar en las estadísticas"""
+        lines = []
+        with self._lock:
+            steps = {step: list(values) for step, values in self.samples.items()}
+        for step, values in sorted(steps.items()):
+            if values:
+                p50, p95 = np.percentile(values, [50, 95])
+                lines.append(f"{step}: p50 {p50:.2f} s - p95 {p95:.2f} s ({len(values)} muestras)")
+        return lines
+
+
+_profiles = {}                    # ruta -> TimingProfile compartido
+_profiles_lock = threading.Lock()
+
+
+def get_timing_profile(path=TIMING_PROFILE_PATH):
+    """Perfil de tiempos compartido por todo el proceso (se crea al primer uso)"""
+    with _profiles_lock:
+        if path not in _profiles:
+            _profiles[path] = TimingProfile(path)
+        return _profiles[path]